@@ -1,53 +1,136 @@
 """
 Cloud functions defining the rubbish-geo functional API.
 """
-from flask import abort
-from firebase_admin.auth import verify_id_token
+from flask import abort, Response
 from firebase_admin import initialize_app
-import shapely
 import os
 
-from rubbish_geo_client import write_pickups, radial_get, sector_get, coord_get, run_get
-from rubbish_geo_common.db_ops import get_db
-from rubbish_geo_common.consts import RUBBISH_TYPES
+from rubbish_geo_common.consts import RUBBISH_TYPE_SET
 
 import sys
 import traceback
-from google.cloud.logging.client import Client
 import logging
 import json
-import inspect
+import time
+from datetime import datetime
+import functools
+
+# NOTE: orjson is considerably faster than the standard library json module at encoding
+# and decoding, which matters because Cloud Functions bill by wall-clock time. It is optional, and
+# the functions fall back to json (via Flask) when it is not installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 if 'RUBBISH_GEO_ENV' not in os.environ:
     raise OSError("RUBBISH_GEO_ENV environment variable not set, exiting.")
 RUBBISH_GEO_ENV = os.environ.get('RUBBISH_GEO_ENV')
-if RUBBISH_GEO_ENV not in ['local', 'dev', 'prod']:
+VALID_ENVS = frozenset({'local', 'dev', 'prod'})
+if RUBBISH_GEO_ENV not in VALID_ENVS:
     raise ValueError(
         'RUBBISH_GEO_ENV environment variable not understood. Must be one of {local, dev, prod}.'
     )
+IS_LOCAL = RUBBISH_GEO_ENV == 'local'
+
+# NOTE: heavy imports (shapely, the rubbish_geo_client library and its SQLAlchemy and
+# scipy dependencies, the Cloud Logging client) are deferred to the handlers that use them. Every
+# handler is deployed from this same module, so module-level imports are paid on every cold start,
+# even by handlers that never touch them.
+
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+def _get_json(request):
+    """
+    Returns the request's JSON payload, or `None` if the payload is not valid JSON.
+    """
+    if orjson is None:
+        return request.get_json(silent=True)
+    try:
+        return orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        return None
+
+def _json_response(payload):
+    """
+    Returns `payload` as a JSON response. Flask serializes plain `dict` return values itself, but
+    using the standard library json module.
+    """
+    if orjson is None:
+        return payload
+    return Response(orjson.dumps(payload), mimetype='application/json')
 
 class LogHandler:
+    # NOTE: in dev and prod, each log_struct call used to be a synchronous RPC to Cloud Logging,
+    # adding several milliseconds to the request per log line. Instead, log lines are collected
+    # over the course of a request and written in a single batch when it finishes (see
+    # _flush_logs_after). This is done synchronously, and not by a background thread, because
+    # Cloud Functions throttle CPU in between requests and may reclaim an instance without running
+    # exit handlers, which would lose whatever was still waiting to be written.
     def __init__(self):
-        if RUBBISH_GEO_ENV == "local":
+        if IS_LOCAL:
             logging.basicConfig(level=logging.INFO)
         else:  # [dev, prod]
+            from google.cloud.logging.client import Client
             self.client = Client()
             self.logger = self.client.logger("functional_api")
-    
+            self.entries = []
+
+    def flush(self):
+        """
+        Writes the log lines collected so far in a single batch.
+        """
+        if IS_LOCAL:
+            return
+        entries, self.entries = self.entries, []
+        if not entries:
+            return
+        batch = self.logger.batch()
+        for timestamp, struct in entries:
+            batch.log_struct(struct, timestamp=timestamp)
+        # a failed log write must not fail the request
+        try:
+            batch.commit()
+        except Exception:
+            traceback.print_exc()
+
     def log_struct(self, struct):
         level = struct.get("level", "info")
+        # Locally, skip formatting (tracebacks, frame lookups, JSON encoding) entirely for log
+        # lines below the configured log level, as these would be discarded anyway.
+        if IS_LOCAL:
+            if not logging.getLogger().isEnabledFor(getattr(logging, level.upper())):
+                return
+
         if level == "error":
             struct['traceback'] = traceback.format_exc()
         
-        # SO#57712700
-        struct["caller"] = inspect.currentframe().f_back.f_code.co_name
+        # SO#57712700. sys._getframe is used instead of inspect.currentframe().f_back because it
+        # skips the inspect wrapper, which adds measurable overhead on every log line.
+        struct["caller"] = sys._getframe(1).f_code.co_name
 
-        if RUBBISH_GEO_ENV == "local":
-            getattr(logging, level)(json.dumps(struct))
+        if IS_LOCAL:
+            getattr(logging, level)(_dumps(struct))
         else:  # [dev, prod]
-            self.logger.log_struct(struct)
+            self.entries.append((datetime.utcnow(), struct))
 
 logger = LogHandler()
+
+def _flush_logs_after(f):
+    """
+    Wraps a function entry point so that its log lines are written before it returns, including
+    when it aborts or raises.
+    """
+    @functools.wraps(f)
+    def inner(request):
+        try:
+            return f(request)
+        finally:
+            logger.flush()
+    return inner
 sys.tracebacklimit = 5
 
 # NOTE(aleksey): calling verify_id_token requires initializing the app. You do not
@@ -57,19 +140,102 @@ sys.tracebacklimit = 5
 # different environment with all the proper bits already set up.
 app = initialize_app()
 
+# Verified ID token claims, keyed by token, so that clients making many requests with the same
+# token only pay for the signature check (and public key fetch) once. Since tokens are verified
+# with check_revoked=False, serving a cached result is exactly as strict as re-verifying it.
+ID_TOKEN_CACHE = dict()
+ID_TOKEN_CACHE_MAX_SIZE = 1024
+
+def _verify_id_token(id_token):
+    """
+    Verifies a Firebase ID token, returning its decoded claims. Raises if the token is invalid.
+    """
+    from firebase_admin.auth import verify_id_token
+
+    now = time.time()
+    claims = ID_TOKEN_CACHE.get(id_token)
+    # a little bit of padding, so that tokens don't expire in-between verification and use
+    if claims is not None and claims['exp'] > now + 5:
+        return claims
+
+    claims = verify_id_token(id_token, app=app, check_revoked=False)
+    if len(ID_TOKEN_CACHE) >= ID_TOKEN_CACHE_MAX_SIZE:
+        for cached_id_token in [t for t, c in ID_TOKEN_CACHE.items() if c['exp'] <= now + 5]:
+            del ID_TOKEN_CACHE[cached_id_token]
+        if len(ID_TOKEN_CACHE) >= ID_TOKEN_CACHE_MAX_SIZE:
+            ID_TOKEN_CACHE.clear()
+    ID_TOKEN_CACHE[id_token] = claims
+    return claims
+
 # NOTE(aleksey): Cloud Functions do not allow direct access to Cloud SQL even though they're in
 # the same VPC :(. The only documented code path for accessing Cloud SQL from inside of a Cloud
 # Function is one that uses UNIX sockets. This requires that the folder that will be used to
 # establish the connection exists (otherwise Linux will error out). "/cloudsql" is the
 # (hard-coded) folder path we'll use. See the following page in the GCP documentation:
 # https://cloud.google.com/sql/docs/postgres/connect-functions.
-if RUBBISH_GEO_ENV != 'local':
-    try:
-        os.mkdir("/cloudsql")
+if not IS_LOCAL:
     # cloud functions recycle disks, so a previous deploy may have created the path already
-    except FileExistsError:
-        pass
+    os.makedirs("/cloudsql", exist_ok=True)
+
+def _wkts_to_geoms(wkts):
+    """
+    Parses a list of WKT strings into a list of shapely geometries.
+    """
+    import shapely.wkt
 
+    # Shapely 2.x can parse the whole batch in a single vectorized GEOS call. Older versions of
+    # Shapely (requirements.txt currently pins 1.7) have to parse the strings one at a time.
+    if hasattr(shapely, 'from_wkt'):
+        return list(shapely.from_wkt(wkts))
+    return [shapely.wkt.loads(wkt) for wkt in wkts]
+
+def _parse_geoms(geoms):
+    """
+    Parses a list of pickup geometries into a list of shapely geometries. Each geometry is either
+    a WKT string or an `[x, y]` coordinate pair. Coordinate pairs are turned into points directly,
+    skipping WKT parsing altogether.
+    """
+    from shapely.geometry import Point
+
+    wkts = [geom for geom in geoms if isinstance(geom, str)]
+    if len(wkts) == len(geoms):
+        return _wkts_to_geoms(wkts)
+    parsed_wkts = iter(_wkts_to_geoms(wkts))
+    parsed = []
+    for geom in geoms:
+        if isinstance(geom, str):
+            parsed.append(next(parsed_wkts))
+        else:
+            x, y = geom
+            parsed.append(Point(float(x), float(y)))
+    return parsed
+
+def _parse_runs(runs):
+    """
+    Parses the runs in a POST_pickups payload in place, converting pickup geometries to shapely
+    geometries and replacing custom pickup types with 'other'. Raises if the payload is malformed.
+    """
+    # Bind this to a local once, as the loop body below runs once per pickup.
+    log_struct = logger.log_struct
+    for firebase_run_id in runs:
+        run = runs[firebase_run_id]
+        geoms = _parse_geoms([pickup['geometry'] for pickup in run])
+        for pickup, geom in zip(run, geoms):
+            pickup['geometry'] = geom
+            # TODO: support custom pickup types.
+            pickup_type = pickup['type']
+            pickup_id = pickup['firebase_id']
+            if pickup_type not in RUBBISH_TYPE_SET:
+                log_struct({
+                    "level": "warning",
+                    "message": (
+                        f"Pickup {pickup_id!r} has custom pickup type {pickup_type!r}. "
+                        f"rubbish-geo does not support custom types yet. Replacing with 'other'."
+                    )
+                })
+                pickup['type'] = 'other'
+
+@_flush_logs_after
 def POST_pickups(request):
     """
     This function services a POST request writing one or more Rubbish runs into the database.
@@ -85,12 +251,38 @@ def POST_pickups(request):
                 "type": <str; from {'tobacco', 'paper', 'plastic', 'other', 'food', 'glass'}>,
                 "timestamp": <int; UTC UNIX timestamp>,
                 "curb": <{'left', 'right', 'middle', None}; side of the street>,
-                "geometry": <str; POINT in WKT format>
+                "geometry": <str; POINT in WKT format, or [x, y] coordinate pair>
             }
         ]
     }
     ```
     """
+    from rubbish_geo_client import write_runs
+    from rubbish_geo_common.db_ops import get_db
+
+    request = _get_json(request)
+    if not isinstance(request, dict):
+        logger.log_struct({
+            "level": "warning",
+            "message": "Request payload is not a JSON object, returning 400."
+        })
+        abort(400)
+    logger.log_struct({
+        "level": "info",
+        "message": f"Processing POST_pickups({list(request.keys())})."
+    })
+
+    # The whole payload is parsed and validated up front, before doing any database work, so that
+    # a malformed request is rejected cheaply.
+    try:
+        _parse_runs(request)
+    except:
+        logger.log_struct({
+            "level": "error",
+            "message": "Request payload is invalid, returning 400."
+        })
+        abort(400)
+
     try:
         get_db(RUBBISH_GEO_ENV)
     except:
@@ -100,38 +292,98 @@ def POST_pickups(request):
         })
         abort(400)
 
-    request = request.get_json()
-    logger.log_struct({
-        "level": "info",
-        "message": f"Processing POST_pickups({list(request.keys())})."
-    })
+    # All runs are written in a single transaction, so a failed write leaves no partial state.
+    try:
+        write_runs(request, RUBBISH_GEO_ENV, logger=logger)
+    except:
+        logger.log_struct({
+            "level": "error",
+            "message": "Run write did not succeed."
+        })
+        abort(400)
 
-    for firebase_run_id in request:
-        run = request[firebase_run_id]
-        for pickup in run:
-            pickup['geometry'] = shapely.wkt.loads(pickup['geometry'])
-            # TODO: support custom pickup types.
-            pickup_type = pickup['type']
-            pickup_id = pickup['firebase_id']
-            if pickup_type not in RUBBISH_TYPES:
+    return _json_response({"status": 200})
+
+# Responses to GET requests, keyed by request type and parsed URL parameters, so that repeated
+# identical requests (map pans, retries, polling) are served without a round trip to the database.
+# Entries are (expiry, response) pairs.
+#
+# NOTE: the cache is disabled by default, and is enabled by setting the RUBBISH_GEO_GET_CACHE_TTL
+# environment variable to a TTL in seconds. GET and POST_pickups are deployed as separate
+# functions, so there is no way for a write to invalidate the cache: with the cache enabled, the
+# GET endpoints may serve results up to GET_CACHE_TTL seconds older than the latest write.
+GET_CACHE = dict()
+GET_CACHE_MAX_SIZE = 1024
+GET_CACHE_TTL = float(os.environ.get('RUBBISH_GEO_GET_CACHE_TTL', 0))
+
+def _cached_get(key, get):
+    """
+    Returns the cached response for `key`, calling `get` to compute (and cache) it on a miss.
+    """
+    if GET_CACHE_TTL <= 0:
+        return get()
+
+    now = time.time()
+    entry = GET_CACHE.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    response = get()
+    if len(GET_CACHE) >= GET_CACHE_MAX_SIZE:
+        for cached_key in [k for k, e in GET_CACHE.items() if e[0] <= now]:
+            del GET_CACHE[cached_key]
+        if len(GET_CACHE) >= GET_CACHE_MAX_SIZE:
+            GET_CACHE.clear()
+    GET_CACHE[key] = (now + GET_CACHE_TTL, response)
+    return response
+
+# Sentinel default value marking a URL parameter as required. See _parse_args.
+REQUIRED = object()
+
+def _parse_bool(value):
+    # Only the first character is checked, so e.g. `true`, `True`, `1`, and `yes` are all true.
+    return value[:1] in ('t', 'T', '1', 'y', 'Y')
+
+def _parse_args(args, spec):
+    """
+    Parses a request's URL parameters. `spec` is a sequence of `(name, type, default)` tuples,
+    one per parameter; the parsed values are returned in the same order. Aborts with a 400 if a
+    required parameter is missing or a parameter fails to parse.
+    """
+    values = []
+    for name, type_, default in spec:
+        value = args.get(name)
+        if value is None:
+            if default is REQUIRED:
                 logger.log_struct({
                     "level": "warning",
-                    "message": (
-                        f"Pickup {pickup_id!r} has custom pickup type {pickup_type!r}. "
-                        f"rubbish-geo does not support custom types yet. Replacing with 'other'."
-                    )
+                    "message": "Request is missing required URL parameters.",
                 })
-                pickup['type'] = 'other'
+                abort(400)
+            values.append(default)
+            continue
         try:
-            write_pickups(run, RUBBISH_GEO_ENV, logger=logger)
-        except:
+            values.append(type_(value))
+        except ValueError:
             logger.log_struct({
-                "level": "error",
-                "message": "Run write did not succeed."
+                "level": "warning",
+                "message": f"Request has invalid {name!r} URL parameter {value!r}.",
             })
             abort(400)
-    
-    return {"status": 200}
+    return values
+
+# URL parameter specs for the GET handlers. See _parse_args.
+GET_RADIAL_ARGS = (
+    ('x', float, REQUIRED), ('y', float, REQUIRED), ('distance', int, REQUIRED),
+    ('include_na', _parse_bool, False), ('offset', int, 0)
+)
+GET_SECTOR_ARGS = (
+    ('sector_name', str, REQUIRED), ('include_na', _parse_bool, False), ('offset', int, 0)
+)
+GET_COORD_ARGS = (
+    ('x', float, REQUIRED), ('y', float, REQUIRED), ('include_na', _parse_bool, False)
+)
+GET_RUN_ARGS = (('run_id', str, REQUIRED),)
 
 def GET_radial(request):
     """
@@ -144,19 +396,9 @@ def GET_radial(request):
     * include_na (optional): `true` or `false`, whether or not to include statistics with no data
     * offset (optional): pagination offset
     """
-    args = request.args
-    if 'x' not in args or 'y' not in args or 'distance' not in args:
-        logger.log_struct({
-            "level": "warning",
-            "message": "Request is missing required URL parameters.",
-        })
-        abort(400)
+    from rubbish_geo_client import radial_get
 
-    x = float(args['x'])
-    y = float(args['y'])
-    distance = int(args['distance'])
-    include_na = args['include_na'].title() == 'True' if 'include_na' in args else False
-    offset = int(args['offset']) if 'offset' in args else 0
+    x, y, distance, include_na, offset = _parse_args(request.args, GET_RADIAL_ARGS)
 
     logger.log_struct({
         "level": "info",
@@ -165,8 +407,11 @@ def GET_radial(request):
     })
 
     try:
-        response = radial_get(
-            (x, y), distance, RUBBISH_GEO_ENV, include_na=include_na, offset=offset
+        response = _cached_get(
+            ('radial', x, y, distance, include_na, offset),
+            lambda: radial_get(
+                (x, y), distance, RUBBISH_GEO_ENV, include_na=include_na, offset=offset
+            )
         )
     except:
         logger.log_struct({
@@ -175,7 +420,7 @@ def GET_radial(request):
         })
         abort(400)
 
-    return {"status": 200, "blockfaces": response}
+    return _json_response({"status": 200, "blockfaces": response})
 
 def GET_sector(request):
     """
@@ -186,16 +431,9 @@ def GET_sector(request):
     * include_na (optional): `true` or `false`, whether or not to include statistics with no data
     * offset (optional): pagination offset
     """
-    args = request.args
-    if 'sector_name' not in args:
-        logger.log_struct({
-            "level": "warning",
-            "message": "Request is missing required URL parameters.",
-        })
-        abort(400)
-    sector_name = args['sector_name']
-    include_na = args['include_na'].title() == 'True' if 'include_na' in args else False
-    offset = int(args['offset']) if 'offset' in args else 0
+    from rubbish_geo_client import sector_get
+
+    sector_name, include_na, offset = _parse_args(request.args, GET_SECTOR_ARGS)
     logger.log_struct({
         "level": "info",
         "message": f"Processing GET_sector(sector_name={sector_name}, "
@@ -203,7 +441,10 @@ def GET_sector(request):
     })
 
     try:
-        response = sector_get(sector_name, RUBBISH_GEO_ENV, include_na=include_na, offset=offset)
+        response = _cached_get(
+            ('sector', sector_name, include_na, offset),
+            lambda: sector_get(sector_name, RUBBISH_GEO_ENV, include_na=include_na, offset=offset)
+        )
     except:
         logger.log_struct({
             "level": "error",
@@ -211,7 +452,7 @@ def GET_sector(request):
         })
         abort(400)
 
-    return {"blockfaces": response}
+    return _json_response({"blockfaces": response})
 
 def GET_coord(request):
     """
@@ -223,19 +464,15 @@ def GET_coord(request):
     * y: coord y
     * include_na (optional): `true` or `false`, whether or not to include statistics with no data
     """
-    args = request.args
-    if 'x' not in args or 'y' not in args:
-        logger.log_struct({
-            "level": "warning",
-            "message": "Request is missing required URL parameters.",
-        })
-        abort(400)
-    x = float(args['x'])
-    y = float(args['y'])
-    include_na = args['include_na'].title() == 'True' if 'include_na' in args else False
+    from rubbish_geo_client import coord_get
+
+    x, y, include_na = _parse_args(request.args, GET_COORD_ARGS)
 
     try:
-        response = coord_get((x, y), RUBBISH_GEO_ENV, include_na=include_na)
+        response = _cached_get(
+            ('coord', x, y, include_na),
+            lambda: coord_get((x, y), RUBBISH_GEO_ENV, include_na=include_na)
+        )
     except:
         logger.log_struct({
             "level": "error",
@@ -247,7 +484,7 @@ def GET_coord(request):
         "message": f"Processing GET_coord(x={x}, y={y}, include_na={include_na})."
     })
 
-    return {"status": 200, "blockfaces": response}
+    return _json_response({"status": 200, "blockfaces": response})
 
 def GET_run(request):
     """
@@ -256,21 +493,16 @@ def GET_run(request):
     Expects the following URL parameters:
     * run_id
     """
-    args = request.args
-    if 'run_id' not in args:
-        logger.log_struct({
-            "level": "warning",
-            "message": "Request is missing required URL parameters.",
-        })
-        abort(400)
-    run_id = args['run_id']
+    from rubbish_geo_client import run_get
+
+    run_id, = _parse_args(request.args, GET_RUN_ARGS)
 
     logger.log_struct({
         "level": "info",
         "message": f"Processing GET_run(run_id={run_id})."
     })
     try:
-        response = run_get(run_id, RUBBISH_GEO_ENV)        
+        response = _cached_get(('run', run_id), lambda: run_get(run_id, RUBBISH_GEO_ENV))
     except:
         logger.log_struct({
             "level": "error",
@@ -278,8 +510,17 @@ def GET_run(request):
         })
         abort(400)
 
-    return {"blockfaces": response}
+    return _json_response({"blockfaces": response})
+
+# Maps GET request_type URL param values to the functions servicing them.
+GET_HANDLERS = {
+    'run': GET_run,
+    'sector': GET_sector,
+    'coord': GET_coord,
+    'radial': GET_radial
+}
 
+@_flush_logs_after
 def GET(request):
     """
     This function is the user-facing part of the function. It passes its input to the correct GET
@@ -300,16 +541,17 @@ def GET(request):
             "message": "Request has no authorization header, returning 403."
         })
         abort(403)
-    try:
-        id_token = authorization.split("Bearer ")[1]
-    except (ValueError, IndexError):
+    # NOTE: str.removeprefix would be nicer, but we deploy to the python37 runtime.
+    if authorization.startswith("Bearer "):
+        id_token = authorization[7:]
+    else:
         logger.log_struct({
             "level": "warning",
             "message": "Request authorization header is invalid, returning 403."
         })
         abort(403)
     try:
-        verify_id_token(id_token, app=app, check_revoked=False)
+        _verify_id_token(id_token)
     except:
         logger.log_struct({
             "level": "warning",
@@ -317,18 +559,11 @@ def GET(request):
         })
         abort(403)
 
-    t = args['request_type']
-    if t == 'run':
-        return GET_run(request)
-    elif t == 'sector':
-        return GET_sector(request)
-    elif t == 'coord':
-        return GET_coord(request)
-    elif t == 'radial':
-        return GET_radial(request)
-    else:
+    handler = GET_HANDLERS.get(args['request_type'])
+    if handler is None:
         logger.log_struct({
             "level": "warning",
             "message": "Request has invalid 'request_type', returning 400."
         })
         abort(400)
+    return handler(request)
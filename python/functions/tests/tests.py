@@ -4,10 +4,13 @@ Tests the functions in the functional `rubbish-geo` API.
 Be sure to stand up the function emulator first.
 """
 
-from datetime import datetime
 import unittest
 import tempfile
 import os
+import json
+import time
+import fcntl
+import hashlib
 
 import requests
 from shapely.geometry import Point, Polygon
@@ -54,27 +57,91 @@ if "WEB_API_KEY" not in os.environ:
     )
 WEB_API_KEY = os.environ["WEB_API_KEY"]
 
-app = firebase_admin.initialize_app()
-custom_token = firebase_admin.auth.create_custom_token('polkstreet').decode('utf8')
-id_token = requests.post(
-    f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithCustomToken?key={WEB_API_KEY}",
-    {'token': custom_token, 'returnSecureToken': True}
-).json()["idToken"]
+# A single session is shared by every test, so that connections to the function emulator are
+# kept alive and reused instead of being reopened on every request.
+SESSION = requests.Session()
+SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Minting an ID token takes a round trip to Google, so the token is cached on disk and reused by
+# later test runs (and by parallel test processes) until it is close to expiring. The cache is
+# keyed by web API key, so that tokens are not reused across projects. The token is a live
+# credential, so the cache file is per-user, and only readable by its owner.
+ID_TOKEN_CACHE_PATH = os.path.join(tempfile.gettempdir(), f"rubbish_id_token_{os.getuid()}.json")
+
+def _open_private(path):
+    """
+    Opens a file for writing that only its owner can read or write, creating or truncating it
+    first. Refuses to follow symlinks, as the file lives in a shared directory.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_NOFOLLOW, 0o600)
+    # the mode passed to os.open only applies to newly created files
+    os.fchmod(fd, 0o600)
+    return os.fdopen(fd, "w")
+
+def _mint_id_token():
+    firebase_admin.initialize_app()
+    custom_token = firebase_admin.auth.create_custom_token('polkstreet').decode('utf8')
+    response = SESSION.post(
+        "https://identitytoolkit.googleapis.com/v1/accounts:signInWithCustomToken"
+        f"?key={WEB_API_KEY}",
+        {'token': custom_token, 'returnSecureToken': True}
+    ).json()
+    return response["idToken"], time.time() + int(response["expiresIn"])
+
+def _get_id_token():
+    key = hashlib.sha256(WEB_API_KEY.encode('utf8')).hexdigest()
+    # the lock keeps parallel test processes from all minting a token at the same time
+    with _open_private(ID_TOKEN_CACHE_PATH + ".lock") as lockfile:
+        fcntl.flock(lockfile, fcntl.LOCK_EX)
+        try:
+            with open(ID_TOKEN_CACHE_PATH, "r") as f:
+                cached = json.load(f)
+            if cached["key"] == key and cached["exp"] - time.time() > 300:
+                return cached["id_token"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        id_token, exp = _mint_id_token()
+        with _open_private(ID_TOKEN_CACHE_PATH) as f:
+            json.dump({"key": key, "id_token": id_token, "exp": exp}, f)
+        return id_token
+
+id_token = _get_id_token()
 print(id_token)
+SESSION.headers.update({"Authorization": f"Bearer {id_token}"})
 
-headers = {"Authorization": f"Bearer {id_token}"}
+def tearDownModule():
+    SESSION.close()
 
 if "FUNCTIONAL_API_HOST" not in os.environ:
     F_URL = "http://localhost:8081"
 else:
     F_URL = os.environ["FUNCTIONAL_API_HOST"]
 
+# Pickup timestamps are not asserted on, so a fixed value is used to keep the payloads
+# reproducible.
+FIXED_TS = 1700000000
+
+def _pickup(firebase_run_id, firebase_id, geometry):
+    """
+    Returns a POST_pickups payload entry for a left-curb glass pickup.
+    """
+    return {
+        'firebase_run_id': firebase_run_id,
+        'firebase_id': firebase_id,
+        'type': 'glass',
+        'timestamp': FIXED_TS,
+        'curb': 'left',
+        'geometry': geometry
+    }
+
 class Test_POST_pickups(unittest.TestCase):
     @clean_db
     @alias_test_db
     @insert_grid
     def testWriteZeroPickups(self):
-        response = requests.post(F_URL, json={})
+        response = SESSION.post(F_URL, json={})
         response.raise_for_status()
         assert response.json() is not None
 
@@ -84,25 +151,11 @@ class Test_POST_pickups(unittest.TestCase):
     def testWriteSinglePickup(self):
         payload = {
             'foo': [
-                    {
-                        'firebase_run_id': 'foo',
-                        'firebase_id': 'baz',
-                        'type': 'glass',
-                        'timestamp': int(datetime.now().timestamp()),
-                        'curb': 'left',
-                        'geometry': 'POINT(0 0.1)'
-                    },
-                    {
-                        'firebase_run_id': 'foo',
-                        'firebase_id': 'ban',
-                        'type': 'glass',
-                        'timestamp': int(datetime.now().timestamp()),
-                        'curb': 'left',
-                        'geometry': 'POINT(0 0.9)'
-                    }
+                _pickup('foo', 'baz', 'POINT(0 0.1)'),
+                _pickup('foo', 'ban', 'POINT(0 0.9)')
             ]
         }
-        response = requests.post(F_URL, json=payload)
+        response = SESSION.post(F_URL, json=payload)
         response.raise_for_status()
         assert response.json() is not None
 
@@ -112,43 +165,29 @@ class Test_POST_pickups(unittest.TestCase):
     def testWriteMultiplePickups(self):
         payload = {
             'foo': [
-                    {
-                        'firebase_run_id': 'foo',
-                        'firebase_id': 'baz',
-                        'type': 'glass',
-                        'timestamp': int(datetime.now().timestamp()),
-                        'curb': 'left',
-                        'geometry': 'POINT(0 0.1)'
-                    },
-                    {
-                        'firebase_run_id': 'foo',
-                        'firebase_id': 'ban',
-                        'type': 'glass',
-                        'timestamp': int(datetime.now().timestamp()),
-                        'curb': 'left',
-                        'geometry': 'POINT(0 0.9)'
-                    }
+                _pickup('foo', 'baz', 'POINT(0 0.1)'),
+                _pickup('foo', 'ban', 'POINT(0 0.9)')
             ],
             'bar': [
-                    {
-                        'firebase_run_id': 'bar',
-                        'firebase_id': 'baz',
-                        'type': 'glass',
-                        'timestamp': int(datetime.now().timestamp()),
-                        'curb': 'left',
-                        'geometry': 'POINT(0.1 0)'
-                    },
-                    {
-                        'firebase_run_id': 'bar',
-                        'firebase_id': 'ban',
-                        'type': 'glass',
-                        'timestamp': int(datetime.now().timestamp()),
-                        'curb': 'left',
-                        'geometry': 'POINT(0.9 0)'
-                    }
+                _pickup('bar', 'baz', 'POINT(0.1 0)'),
+                _pickup('bar', 'ban', 'POINT(0.9 0)')
+            ]
+        }
+        response = SESSION.post(F_URL, json=payload)
+        response.raise_for_status()
+        assert response.json() is not None
+
+    @clean_db
+    @alias_test_db
+    @insert_grid
+    def testWriteCoordinatePairPickups(self):
+        payload = {
+            'foo': [
+                _pickup('foo', 'baz', [0, 0.1]),
+                _pickup('foo', 'ban', 'POINT(0 0.9)')
             ]
         }
-        response = requests.post(F_URL, json=payload)
+        response = SESSION.post(F_URL, json=payload)
         response.raise_for_status()
         assert response.json() is not None
 
@@ -158,9 +197,8 @@ class Test_GET_radial(unittest.TestCase):
     @alias_test_db
     @insert_grid
     def testGetZero(self):
-        response = requests.get(
-            f"{F_URL}?request_type=radial&x=0&y=0&distance=0&include_na=False&offset=0",
-            headers=headers
+        response = SESSION.get(
+            f"{F_URL}?request_type=radial&x=0&y=0&distance=0&include_na=False&offset=0"
         )
         response.raise_for_status()
         assert response.json() is not None
@@ -172,9 +210,8 @@ class Test_GET_radial(unittest.TestCase):
         pickups = valid_pickups_from_geoms([Point(0.1, 0), Point(0.9, 0)], curb='left')
         write_pickups(pickups, 'local')
 
-        response = requests.get(
-            f"{F_URL}?request_type=radial&x=0&y=0&distance=1&include_na=False&offset=0",
-            headers=headers
+        response = SESSION.get(
+            f"{F_URL}?request_type=radial&x=0&y=0&distance=1&include_na=False&offset=0"
         )
         response.raise_for_status()
         result = response.json()
@@ -190,9 +227,8 @@ class Test_GET_radial(unittest.TestCase):
         pickups = valid_pickups_from_geoms([Point(0, 0.1), Point(0, 0.9)], curb='left')
         write_pickups(pickups, 'local')
 
-        response = requests.get(
-            f"{F_URL}?request_type=radial&x=0&y=0&distance=1&include_na=False&offset=0",
-            headers=headers
+        response = SESSION.get(
+            f"{F_URL}?request_type=radial&x=0&y=0&distance=1&include_na=False&offset=0"
         )
         response.raise_for_status()
         result = response.json()
@@ -214,9 +250,8 @@ class Test_GET_sector(unittest.TestCase):
         pickups = valid_pickups_from_geoms([Point(0.1, 0), Point(0.9, 0)], curb='left')
         write_pickups(pickups, 'local')
 
-        response = requests.get(
-            f"{F_URL}?request_type=sector&sector_name=Polygon%20Land&include_na=False&offset=0",
-            headers=headers
+        response = SESSION.get(
+            f"{F_URL}?request_type=sector&sector_name=Polygon%20Land&include_na=False&offset=0"
         )
         response.raise_for_status()
         result = response.json()
@@ -235,9 +270,8 @@ class Test_GET_coord(unittest.TestCase):
         pickups = valid_pickups_from_geoms([Point(0.1, 0), Point(0.9, 0)], curb='left')
         write_pickups(pickups, 'local')
 
-        response = requests.get(
-            f"{F_URL}?request_type=coord&x=0&y=0&include_na=False&offset=0",
-            headers=headers
+        response = SESSION.get(
+            f"{F_URL}?request_type=coord&x=0&y=0&include_na=False&offset=0"
         )
         response.raise_for_status()
         result = response.json()
@@ -254,7 +288,7 @@ class Test_GET_run(unittest.TestCase):
         )
         write_pickups(pickups, 'local')
 
-        response = requests.get(f"{F_URL}?request_type=run&run_id=foo", headers=headers)
+        response = SESSION.get(f"{F_URL}?request_type=run&run_id=foo")
         response.raise_for_status()
         result = response.json()
 
@@ -0,0 +1,50 @@
+"""Add indexes supporting the functional API queries.
+
+Revision ID: 17b1c64a481c
+Revises: 314f1a2e85e9
+Create Date: 2026-10-16 10:12:41.503127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '17b1c64a481c'
+down_revision = '314f1a2e85e9'
+branch_labels = None
+depends_on = None
+
+# NOTE: geoalchemy2 creates a GIST index named idx_<table>_<column> for every geometry
+# column when the table is created, so these should already exist. They are created here with
+# IF NOT EXISTS (under the same names) just in case, and are left in place on downgrade.
+SPATIAL_INDEXES = [
+    ("pickups", "snapped_geometry"),
+    ("centerlines", "geometry"),
+    ("sectors", "geometry"),
+]
+
+
+def upgrade():
+    for table, column in SPATIAL_INDEXES:
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} USING GIST ({column});"
+        )
+    # run_get looks up pickups by firebase_run_id.
+    op.create_index("ix_pickups_firebase_run_id", "pickups", ["firebase_run_id"])
+    # Pickups are grouped by blockface, and reference centerlines by foreign key.
+    op.create_index("ix_pickups_centerline_id_curb", "pickups", ["centerline_id", "curb"])
+    # Every GET query looks up blockface statistics by centerline, and writes look them up by
+    # blockface (centerline and curb).
+    op.create_index(
+        "ix_blockface_statistics_centerline_id_curb", "blockface_statistics",
+        ["centerline_id", "curb"]
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ix_blockface_statistics_centerline_id_curb", table_name="blockface_statistics"
+    )
+    op.drop_index("ix_pickups_centerline_id_curb", table_name="pickups")
+    op.drop_index("ix_pickups_firebase_run_id", table_name="pickups")
@@ -7,8 +7,6 @@ Create Date: 2020-12-30 18:55:14.292171
 
 """
 from alembic import op
-# import sqlalchemy as sa
-from sqlalchemy.dialects.postgresql import ENUM
 
 # revision identifiers, used by Alembic.
 revision = '314f1a2e85e9'
@@ -16,10 +14,27 @@ down_revision = 'a3fa9dac3f4e'
 branch_labels = None
 depends_on = None
 
+# NOTE: ALTER TYPE ... RENAME VALUE (Postgres 10+) is a catalog-only change, unlike
+# changing the column type, which rewrites every row in the table. The rename is conditional
+# because databases initialized with the current version of the initial migration already have
+# the "middle" value.
+RENAME_CURB_VALUE = """
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_enum JOIN pg_type ON pg_enum.enumtypid = pg_type.oid
+        WHERE pg_type.typname = 'curb' AND pg_enum.enumlabel = '{old}'
+    ) THEN
+        ALTER TYPE curb RENAME VALUE '{old}' TO '{new}';
+    END IF;
+END
+$$;
+"""
+
 
 def upgrade():
-    op.alter_column("pickups", "curb", type_=ENUM("left", "right", "middle", name="curb"))
+    op.execute(RENAME_CURB_VALUE.format(old="center", new="middle"))
 
 
 def downgrade():
-    op.alter_column("pickups", "curb", type_=ENUM("left", "right", "center", name="curb"))
+    op.execute(RENAME_CURB_VALUE.format(old="middle", new="center"))
@@ -0,0 +1,65 @@
+"""Make blockface statistics unique per blockface.
+
+Revision ID: 4b8e2a6c1d93
+Revises: 9c0e5b7d2f41
+Create Date: 2026-10-16 13:08:45.117362
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b8e2a6c1d93'
+down_revision = '9c0e5b7d2f41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # write_pickups upserts blockface statistics (INSERT ... ON CONFLICT (centerline_id, curb)),
+    # which requires a unique constraint on the blockface. The constraint is backed by an index
+    # on the same columns, so it replaces the plain lookup index added in 17b1c64a481c.
+    #
+    # Writes used to look up the blockface's statistic and insert one if there was none, so two
+    # concurrent first writes to a blockface may have left duplicate rows. These are merged into
+    # the blockface's oldest row first: the runs are summed, and the densities are averaged,
+    # weighted by their number of runs.
+    op.execute("""
+        UPDATE blockface_statistics AS keep
+        SET num_runs = merged.num_runs, rubbish_per_meter = merged.rubbish_per_meter
+        FROM (
+            SELECT
+                MIN(id) AS id,
+                SUM(num_runs) AS num_runs,
+                SUM(rubbish_per_meter * num_runs) / SUM(num_runs) AS rubbish_per_meter
+            FROM blockface_statistics
+            GROUP BY centerline_id, curb
+            HAVING COUNT(*) > 1
+        ) AS merged
+        WHERE keep.id = merged.id;
+    """)
+    op.execute("""
+        DELETE FROM blockface_statistics AS extra
+        USING blockface_statistics AS keep
+        WHERE extra.centerline_id = keep.centerline_id
+            AND extra.curb = keep.curb
+            AND extra.id > keep.id;
+    """)
+    op.drop_index(
+        "ix_blockface_statistics_centerline_id_curb", table_name="blockface_statistics"
+    )
+    op.create_unique_constraint(
+        "uq_blockface_statistics_centerline_id_curb", "blockface_statistics",
+        ["centerline_id", "curb"]
+    )
+
+
+def downgrade():
+    op.drop_constraint(
+        "uq_blockface_statistics_centerline_id_curb", "blockface_statistics", type_="unique"
+    )
+    op.create_index(
+        "ix_blockface_statistics_centerline_id_curb", "blockface_statistics",
+        ["centerline_id", "curb"]
+    )
@@ -0,0 +1,30 @@
+"""Add a partial index on the current centerlines of each zone.
+
+Revision ID: 9c0e5b7d2f41
+Revises: 17b1c64a481c
+Create Date: 2026-10-16 11:52:19.604771
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c0e5b7d2f41'
+down_revision = '17b1c64a481c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # update_zone caps the current centerlines of a zone (zone_id = ? AND last_zone_generation IS
+    # NULL) on every run. Old centerline generations are kept forever, so the index only covers
+    # the current ones, which keeps it small as the history accumulates.
+    op.create_index(
+        "ix_centerlines_current_zone_id", "centerlines", ["zone_id"],
+        postgresql_where=sa.text("last_zone_generation IS NULL")
+    )
+
+
+def downgrade():
+    op.drop_index("ix_centerlines_current_zone_id", table_name="centerlines")
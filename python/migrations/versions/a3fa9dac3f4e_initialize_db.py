@@ -19,6 +19,12 @@ from geoalchemy2 import Geometry
 # from rubbish_geo_common.consts import RUBBISH_TYPES
 RUBBISH_TYPES = ['tobacco', 'paper', 'plastic', 'other', 'food', 'glass']
 
+# NOTE: these types are shared by more than one table, so they are created explicitly,
+# once, up front. Left to its own devices create_table emits CREATE TYPE for the first column using
+# the type and silently skips it (after a checkfirst probe) for every other one.
+RUBBISH_TYPE_ENUM = ENUM(*RUBBISH_TYPES, name="rubbish_type", create_type=False)
+CURB_ENUM = ENUM('left', 'right', 'middle', name='curb', create_type=False)
+
 # revision identifiers, used by Alembic.
 revision = "a3fa9dac3f4e"
 down_revision = None
@@ -27,6 +33,10 @@ depends_on = None
 
 
 def upgrade():
+    bind = op.get_bind()
+    RUBBISH_TYPE_ENUM.create(bind, checkfirst=False)
+    CURB_ENUM.create(bind, checkfirst=False)
+
     # Zones are meaningful regions, e.g. "San Francisco", meant to be imported all at once.
     # Zones have zone generations. Centerlines are keyed to specific zone generations.
     op.create_table(
@@ -74,12 +84,12 @@ def upgrade():
         sa.Column("firebase_id", sa.String, nullable=False),  # foreign key to app DB pickup
         sa.Column("firebase_run_id", sa.String, nullable=False),  # foreign key to app DB run
         sa.Column("centerline_id", sa.Integer, sa.ForeignKey("centerlines.id"), nullable=False),
-        sa.Column("type", ENUM(*RUBBISH_TYPES, name="rubbish_type"), nullable=False),
+        sa.Column("type", RUBBISH_TYPE_ENUM, nullable=False),
         sa.Column("timestamp", sa.DateTime, nullable=False),
         sa.Column("geometry", Geometry("POINT", srid=4326), nullable=False),
         sa.Column("snapped_geometry", Geometry("POINT", srid=4326), nullable=False),
         sa.Column("linear_reference", sa.Float(precision=3), nullable=False),
-        sa.Column("curb", ENUM('left', 'right', 'middle', name='curb'), nullable=False)
+        sa.Column("curb", CURB_ENUM, nullable=False)
     )
     # Blockfaces are a psuedo-virtual table defined by the combination of {centerline,curb}.
     # A centerline will typically have two blockfaces: one for the left side of the street and
@@ -91,7 +101,7 @@ def upgrade():
         "blockface_statistics",
         sa.Column("id", sa.Integer, primary_key=True),
         sa.Column("centerline_id", sa.Integer, sa.ForeignKey("centerlines.id"), nullable=False),
-        sa.Column("curb", ENUM('left', 'right', 'center', name='curb'), nullable=False),
+        sa.Column("curb", CURB_ENUM, nullable=False),
         sa.Column("rubbish_per_meter", sa.Float, nullable=False, index=True),
         sa.Column("num_runs", sa.Integer, nullable=False)
     )
@@ -103,5 +113,6 @@ def downgrade():
     op.drop_table("sectors")
     op.drop_table("zone_generations")
     op.drop_table("zones")
-    op.execute("DROP TYPE curb")
-    op.execute("DROP TYPE rubbish_type")
+    bind = op.get_bind()
+    CURB_ENUM.drop(bind, checkfirst=False)
+    RUBBISH_TYPE_ENUM.drop(bind, checkfirst=False)
@@ -4,7 +4,7 @@ The rubbish-admin CLI application.
 
 import click
 import os
-import subprocess
+import shutil
 import warnings
 import time
 
@@ -12,8 +12,9 @@ from rubbish_geo_common.db_ops import (
     set_db as _set_db, reset_db as _reset_db, get_db as _get_db, run_cloud_sql_proxy
 )
 from .ops import (
-    update_zone as _update_zone, insert_sector as _insert_sector, delete_sector as _delete_sector,
-    show_sectors as _show_sectors, show_zones as _show_zones, show_dbs
+    update_zone as _update_zone, update_zones as _update_zones, insert_sector as _insert_sector,
+    delete_sector as _delete_sector, show_sectors as _show_sectors, show_zones as _show_zones,
+    show_dbs
 )
 
 @click.group()
@@ -26,11 +27,10 @@ def cli():
     "-w", "--wait", default=5, help="How long to wait for Cloud SQL Proxy to initialize (if needed)."
 )
 def connect(profile, wait):
-    sp = subprocess.run(["which", "psql"], capture_output=True)
-    if sp.returncode != 0:
+    psql = shutil.which("psql")
+    if psql is None:
         print("psql not installed, install that first.")
         return
-    psql = sp.stdout.decode("utf-8").rstrip()
     connstr, conntype, _ = _get_db(profile)
     if connstr == None:
         print("database not set, set that first with set_db")
@@ -105,6 +105,19 @@ def update_zone(profile, osmnx_name, name, wait):
         name = osmnx_name
     _update_zone(osmnx_name=osmnx_name, name=name, profile=profile, wait=wait)
 
+@click.command(name="update-zones", short_help="Runs update-zone on many zones in parallel.")
+@click.argument("profile")
+@click.argument("osmnx_names", nargs=-1, required=True)
+@click.option(
+    "-j", "--workers", default=None, type=int,
+    help="Number of zones to update at once. Defaults to the number of CPUs."
+)
+@click.option(
+    "-w", "--wait", default=5, help="How long to wait for Cloud SQL Proxy to initialize (if needed)."
+)
+def update_zones(profile, osmnx_names, workers, wait):
+    _update_zones(list(osmnx_names), profile=profile, workers=workers, wait=wait)
+
 @click.command(name="show-zones", short_help="Pretty-prints zones in the database.")
 @click.argument("profile")
 @click.option(
@@ -145,6 +158,7 @@ cli.add_command(get_db)
 cli.add_command(set_db)
 cli.add_command(reset_db)
 cli.add_command(update_zone)
+cli.add_command(update_zones)
 cli.add_command(show_zones)
 cli.add_command(insert_sector)
 cli.add_command(delete_sector)
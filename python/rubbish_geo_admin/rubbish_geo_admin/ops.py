@@ -4,14 +4,15 @@ interactively via the rubbish-admin CLI.
 """
 import os
 from datetime import datetime
-import warnings
 import math
+import io
+import json
 
-import osmnx as ox
-import geopandas as gpd
+import numpy as np
 import sqlalchemy as sa
-from geopy.distance import distance
 import shapely
+import shapely.wkb
+import shapely.ops
 from geoalchemy2.shape import to_shape
 from shapely.geometry import Polygon
 from rich.console import Console
@@ -20,10 +21,14 @@ from rich.table import Table
 from rubbish_geo_common.db_ops import db_sessionmaker, get_db_cfg, OptionalCloudSQLProxyProcess
 from rubbish_geo_common.orm import Zone, ZoneGeneration, Centerline, Sector
 
-def _get_name_for_centerline_edge(G, u, v):
+# NOTE: osmnx and geopandas (and everything they pull in: networkx, pandas, fiona,
+# pyproj...) take seconds to import, and this module is imported by the rubbish-admin CLI on every
+# invocation, including the ones that never touch them (get-db, set-db, connect, --help). They are
+# imported inside of the functions that use them instead.
+
+def _get_centerline_names(G):
     """
-    Returns a nice name for a specific centerline in the given osmnx graph. `u` and `v` are the
-    (networkx) IDs of the centerline endpoints.
+    Returns nice names for all of the centerlines in the given osmnx graph, in `G.edges` order.
     
     We format centerline names thusly:
     * "Unknown" if the centerline has no name.
@@ -38,10 +43,7 @@ def _get_name_for_centerline_edge(G, u, v):
     
     Note that these names are non-unique, if you need a UID, use the computed ID instead.
     """
-    def c_len(u, v):
-        return math.sqrt(abs(G.nodes[u]['x'] - G.nodes[v]['x'])**2 +
-                         abs(G.nodes[u]['y'] - G.nodes[v]['y'])**2)
-    def get_name(G, u, v):
+    def get_name(u, v):
         struct = G[u][v][0]
         if 'name' not in struct:
             return "Unknown"
@@ -53,65 +55,139 @@ def _get_name_for_centerline_edge(G, u, v):
             return n[0]
         else:
             return "Unknown"
-    
-    name = get_name(G, u, v)
-    if name == "Unknown":
-        return "Unknown"
 
-    u_neighbors = list(G[u].keys())
-    v_neighbors = list(G[v].keys())
+    # Every node is an endpoint of several centerlines, so the names and lengths of the
+    # centerlines leaving each node are computed once and cached, instead of once per centerline.
+    # The node coordinates are pulled out of the graph's node attribute dicts up front for the
+    # same reason.
+    xy = {n: (data['x'], data['y']) for n, data in G.nodes(data=True)}
+    neighbors = dict()
+    def get_neighbors(u):
+        if u not in neighbors:
+            ux, uy = xy[u]
+            neighbors[u] = [
+                (get_name(u, w), math.sqrt((ux - xy[w][0])**2 + (uy - xy[w][1])**2))
+                for w in G[u]
+            ]
+        return neighbors[u]
+
+    # Returns the name of the longest centerline leaving u not named `name`, or None if there is
+    # no such centerline. Ties go to the first such centerline.
+    def get_cross_street_name(u, name):
+        maxlen, maxlen_name = 0, None
+        for w_name, w_len in get_neighbors(u):
+            if w_name != name and w_len > maxlen:
+                maxlen, maxlen_name = w_len, w_name
+        return maxlen_name
 
     # TODO: make sure southern edge is first and northern edge is last, as per
     # `point_side_of_centerline` rules.
-    
-    u_w_maxlen, u_w_maxlen_idx = 0, None
-    for w_i, w in enumerate(u_neighbors):
-        if get_name(G, u, w) == name:
+    names = []
+    for u, v, _ in G.edges:
+        name = get_name(u, v)
+        if name == "Unknown":
+            names.append(name)
             continue
-        u_w_cand_len = c_len(u, w)
-        if u_w_cand_len > u_w_maxlen:
-            u_w_maxlen = c_len(u, w)
-            u_w_maxlen_idx = w_i
-
-    v_w_maxlen, v_w_maxlen_idx = 0, None
-    for w_i, w in enumerate(v_neighbors):
-        if get_name(G, v, w) == name:
-            continue
-        v_w_cand_len = c_len(v, w)
-        if v_w_cand_len > v_w_maxlen:
-            v_w_maxlen = c_len(v, w)
-            v_w_maxlen_idx = w_i
-    
-    # Centerline names entries may be NaN, a str name, or a list[str] of names. AFAIK there
-    # isn't any interesting information in the ordering of names, so we'll use first-wins
-    # rules for list[str]. For NaN names, we'll insert an "Unknown" string.
-    if v_w_maxlen_idx is not None:
-        w = v_neighbors[v_w_maxlen_idx]
-        v_w_name = get_name(G, v, w)
-    else:
-        v_w_name = None
-    if u_w_maxlen_idx is not None:
-        w = u_neighbors[u_w_maxlen_idx]
-        u_w_name = get_name(G, u, w)
+
+        u_w_name = get_cross_street_name(u, name)
+        v_w_name = get_cross_street_name(v, name)
+        if u_w_name is None and v_w_name is None:
+            names.append(name)
+        elif u_w_name is None:
+            names.append(f"{name} off {v_w_name}")
+        elif v_w_name is None:
+            names.append(f"{name} off {u_w_name}")
+        else:
+            names.append(f"{name} b/w {v_w_name} and {u_w_name}")
+    return names
+
+def _configure_osmnx_cache(ox):
+    """
+    Turns on osmnx's on-disk cache of Overpass API responses if the RUBBISH_OSMNX_CACHE
+    environment variable is set (to the cache directory).
+    """
+    # NOTE: the cache never expires, and the point of a zone update is to pick up the
+    # latest OSM data, so this is opt-in. It's useful when repeatedly loading the same zones, e.g.
+    # when developing or when retrying a failed update.
+    cache_folder = os.environ.get('RUBBISH_OSMNX_CACHE')
+    if not cache_folder:
+        return
+    cache_folder = os.path.expanduser(cache_folder)
+    # osmnx moved its configuration from ox.config() to ox.settings in version 1.0.
+    if hasattr(ox, 'settings'):
+        ox.settings.use_cache = True
+        ox.settings.cache_folder = cache_folder
     else:
-        u_w_name = None
-    
-    if u_w_maxlen_idx is None and v_w_maxlen_idx is None:
-        return name
-    elif u_w_maxlen_idx is None:
-        return f"{name} off {v_w_name}"
-    elif v_w_maxlen_idx is None:
-        return f"{name} off {u_w_name}"
+        ox.config(use_cache=True, cache_folder=cache_folder)
+
+def _explode_coords(linestrings):
+    """
+    Returns the coordinates of the given linestrings as flat `lons` and `lats` float64 arrays,
+    plus an `offsets` array of length `len(linestrings) + 1`. The coordinates of the i-th
+    linestring are at `offsets[i]:offsets[i + 1]`.
+    """
+    if hasattr(shapely, 'get_coordinates'):
+        # Shapely 2.x extracts all of the coordinates in a single call.
+        linestrings = np.asarray(linestrings, dtype=object)
+        coords = shapely.get_coordinates(linestrings)
+        counts = shapely.get_num_coordinates(linestrings)
     else:
-        return f"{name} b/w {v_w_name} and {u_w_name}"
+        coords = [np.asarray(linestring.coords) for linestring in linestrings]
+        counts = [len(linestring_coords) for linestring_coords in coords]
+        coords = np.concatenate(coords) if len(coords) > 0 else np.zeros((0, 2))
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return coords[:, 0].astype(np.float64), coords[:, 1].astype(np.float64), offsets
+
+def _calculate_linestring_lengths(linestrings):
+    """
+    Returns an array of the geodesic lengths, in meters, of the given (EPSG:4326) linestrings.
+    """
+    from pyproj import Geod
+
+    # The segments of all of the linestrings are measured in one vectorized call, which runs in
+    # PROJ's C code, instead of one Python-level geodesic calculation per segment. This measures
+    # the spurious segments connecting the end of each linestring to the start of the next one as
+    # well, but those are excluded when the segment lengths are summed up per linestring.
+    lons, lats, offsets = _explode_coords(linestrings)
+    if len(offsets) == 1:
+        return np.zeros(0)
+    _, _, segment_lengths = Geod(ellps="WGS84").inv(lons[:-1], lats[:-1], lons[1:], lats[1:])
+    # cumulative_lengths[i] is the sum of the lengths of segments [0, i).
+    cumulative_lengths = np.concatenate([[0], np.cumsum(segment_lengths)])
+    return cumulative_lengths[offsets[1:] - 1] - cumulative_lengths[offsets[:-1]]
+
+# Columns written by _copy_centerlines, in order.
+CENTERLINE_COLUMNS = [
+    "geometry", "first_zone_generation", "last_zone_generation", "zone_id", "osmid", "name",
+    "length_in_meters"
+]
+
+# The GIST index on centerlines.geometry, and the number of new centerlines past which
+# update_zone may rebuild it instead of updating it (on the initial load only). See
+# _write_zone_update.
+CENTERLINE_GEOMETRY_INDEX = "idx_centerlines_geometry"
+CENTERLINE_INDEX_REBUILD_THRESHOLD = 50000
+
+def _copy_centerlines(centerlines, cursor):
+    """
+    Writes a GeoDataFrame of centerlines to the centerlines table using the given (psycopg2)
+    cursor. Does not commit.
 
-def _calculate_linestring_length(linestring):
-    length = 0
-    for idx_b in range(1, len(linestring.coords)):
-        idx_a = idx_b - 1
-        # NOTE: geopy uses (y, x) order, shapely uses (x, y) order.
-        length += distance(linestring.coords[idx_a][::-1], linestring.coords[idx_b][::-1]).meters
-    return length
+    The rows are streamed to the database in a single COPY, which is much faster than the
+    one-INSERT-per-row approach used by GeoDataFrame.to_postgis.
+    """
+    rows = centerlines[CENTERLINE_COLUMNS[1:]].assign(
+        geometry=[shapely.wkb.dumps(geom, hex=True, srid=4326) for geom in centerlines.geometry]
+    )[CENTERLINE_COLUMNS]
+    buf = io.StringIO()
+    rows.to_csv(buf, index=False, header=False, na_rep="\\N")
+    buf.seek(0)
+    cursor.copy_expert(
+        f"COPY centerlines ({', '.join(CENTERLINE_COLUMNS)}) FROM STDIN "
+        f"WITH (FORMAT CSV, NULL '\\N')",
+        buf
+    )
 
 def _poly_wkb_to_bounds_str(wkb):
     bounds = to_shape(wkb).bounds
@@ -127,125 +203,225 @@ def update_zone(osmnx_name, name, profile, centerlines=None, wait=5, force_downl
     The optional `centerlines` argument is used to avoid a network request in testing.
     """
     with OptionalCloudSQLProxyProcess(profile, wait=wait, force_download=force_download):
-        session = db_sessionmaker(profile)()
+        _update_zone(osmnx_name, name, profile, centerlines=centerlines)
 
-        # insert zone
-        # NOTE: flush writes DB ops to the database's transactional buffer without actually
-        # performing a commit (and closing the transaction). This is important because it 
-        # allows us to reserve a primary key ID from the corresponding auto-increment 
-        # sequence, which we need when we use it as a foreign key. See SO#620610.
-        if name is None:
-            name = osmnx_name
-        zone_query = (session
-            .query(Zone)
-            .filter(Zone.osmnx_name == osmnx_name)
-            .one_or_none()
-        )
-        zone_already_exists = zone_query is not None
-        if zone_already_exists:
-            zone = zone_query
-        else:
-            # We need to satisfy the non-null bounding box constraint to flush, but we don't have
-            # the centerlines yet so we can't calculate it yet. For now, just use temp bounds.
-            temp_bbox = f'SRID=4326;{str(Polygon([[0, 0], [0, 1], [1, 1], [1, 0], [0, 0]]))}'
-            zone = Zone(osmnx_name=osmnx_name, name=name, bounding_box=temp_bbox)
-            session.add(zone)
-            session.flush()
-
-        # modify old and insert new zone generation
-        if zone_already_exists:
-            zone_generation_query = (session
-                .query(ZoneGeneration)
-                .filter(ZoneGeneration.zone_id == zone.id)
-                .order_by(ZoneGeneration.generation)
-                .all()
-            )
-            next_zone_generation = zone_generation_query[-1].generation + 1
-        else:
-            next_zone_generation = 0
-        zone_generation = ZoneGeneration(
-            zone_id=zone.id, generation=next_zone_generation, final_timestamp=None
+def _update_zone(osmnx_name, name, profile, centerlines=None, allow_index_rebuild=True):
+    """
+    Implements update_zone. Expects the database to already be reachable (e.g. that the Cloud SQL
+    Proxy, if one is needed, is already running).
+
+    `allow_index_rebuild` controls whether a large update may rebuild the centerline spatial
+    index; see _write_zone_update.
+    """
+    # A single session (and transaction) is used for the entire update. It is rolled back if
+    # anything goes wrong, including failures fetching or processing the centerlines.
+    session = db_sessionmaker(profile)()
+    try:
+        _write_zone_update(
+            session, osmnx_name, name, centerlines, allow_index_rebuild=allow_index_rebuild
         )
-        session.add(zone_generation)
+        session.commit()
+    except:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def _write_zone_update(session, osmnx_name, name, centerlines, allow_index_rebuild=True):
+    """
+    Writes a zone update to the session. Does not commit.
+    """
+    # insert zone
+    # NOTE: flush writes DB ops to the database's transactional buffer without actually
+    # performing a commit (and closing the transaction). This is important because it 
+    # allows us to reserve a primary key ID from the corresponding auto-increment 
+    # sequence, which we need when we use it as a foreign key. See SO#620610.
+    if name is None:
+        name = osmnx_name
+    zone_query = (session
+        .query(Zone)
+        .filter(Zone.osmnx_name == osmnx_name)
+        .one_or_none()
+    )
+    zone_already_exists = zone_query is not None
+    if zone_already_exists:
+        zone = zone_query
+    else:
+        # We need to satisfy the non-null bounding box constraint to flush, but we don't have
+        # the centerlines yet so we can't calculate it yet. For now, just use temp bounds.
+        temp_bbox = f'SRID=4326;{str(Polygon([[0, 0], [0, 1], [1, 1], [1, 0], [0, 0]]))}'
+        zone = Zone(osmnx_name=osmnx_name, name=name, bounding_box=temp_bbox)
+        session.add(zone)
         session.flush()
 
-        # insert centerlines
-        if centerlines is None:
-            G = ox.graph_from_place(osmnx_name, simplify=True, network_type="drive")
-            _, edges = ox.graph_to_gdfs(G)
-
-            # Centerline names entries may be NaN, a str name, or a list[str] of names. AFAIK there
-            # isn't any interesting information in the ordering of names, so we'll use first-wins
-            # rules for list[str]. For NaN names, we'll insert an "Unknown" string.
-            #
-            # Centerline osmid values cannot be NaN, but can map to a list. It's unclear why this
-            # is the case.
-            names = []
-            for edge in G.edges:
-                u, v, _ = edge
-                names.append(_get_name_for_centerline_edge(G, u, v))
-            edges = edges.assign(
-                name=names,
-                osmid=edges.osmid.map(lambda v: v if isinstance(v, int) else v[0])
-            )
-            centerlines = gpd.GeoDataFrame(
-                {"first_zone_generation": zone_generation.id, "last_zone_generation": None,
-                "zone_id": zone.id, "osmid": edges.osmid, "name": edges.name},
-                index=range(len(edges)),
-                geometry=edges.geometry
-            )
-            centerlines.crs = "epsg:4326"
-            centerlines["length_in_meters"] = centerlines.geometry.map(_calculate_linestring_length)
-        
+    # modify old and insert new zone generation
+    if zone_already_exists:
+        max_zone_generation = (session
+            .query(sa.func.max(ZoneGeneration.generation))
+            .filter(ZoneGeneration.zone_id == zone.id)
+            .scalar()
+        )
+        next_zone_generation = 0 if max_zone_generation is None else max_zone_generation + 1
+    else:
+        next_zone_generation = 0
+    zone_generation = ZoneGeneration(
+        zone_id=zone.id, generation=next_zone_generation, final_timestamp=None
+    )
+    session.add(zone_generation)
+    session.flush()
+
+    # insert centerlines
+    if centerlines is None:
+        import osmnx as ox
+        import geopandas as gpd
+        _configure_osmnx_cache(ox)
+        G = ox.graph_from_place(osmnx_name, simplify=True, network_type="drive")
+        _, edges = ox.graph_to_gdfs(G)
+
+        # Centerline names entries may be NaN, a str name, or a list[str] of names. AFAIK there
+        # isn't any interesting information in the ordering of names, so we'll use first-wins
+        # rules for list[str]. For NaN names, we'll insert an "Unknown" string.
+        #
+        # Centerline osmid values cannot be NaN, but can map to a list. It's unclear why this
+        # is the case.
+        names = _get_centerline_names(G)
+        osmids = edges.osmid
+        if osmids.dtype == object:
+            # .str[0] takes the first element of the lists, and is NaN for the plain ints
+            osmids = osmids.str[0].fillna(osmids).astype('int64')
+        # The frame is built from the underlying arrays, which skips copying edges and keeps
+        # pandas from aligning the columns on the edges index (which is (u, v, key) in newer
+        # versions of osmnx).
+        centerlines = gpd.GeoDataFrame(
+            {"first_zone_generation": zone_generation.id, "last_zone_generation": None,
+            "zone_id": zone.id, "osmid": osmids.values, "name": names},
+            geometry=edges.geometry.values,
+            crs="epsg:4326"
+        )
+        # osmnx already measures (great-circle) edge lengths in meters when it builds the
+        # graph, so there is no need to measure them again.
+        if "length" in edges.columns:
+            centerlines["length_in_meters"] = edges["length"].astype("float64").values
         else:
-            centerlines["length_in_meters"] = centerlines.geometry.map(_calculate_linestring_length)
+            centerlines["length_in_meters"] = _calculate_linestring_lengths(centerlines.geometry)
+    
+    else:
+        centerlines["length_in_meters"] = _calculate_linestring_lengths(centerlines.geometry)
+
+    minx, miny, maxx, maxy = centerlines.total_bounds
+    poly = Polygon([[minx, miny], [minx, maxy], [maxx, maxy], [maxx, miny], [minx, miny]])
+    bbox = f'SRID=4326;{str(poly)}'
+    zone.bounding_box = bbox
+
+    # For large loads, it is faster to build the spatial index from scratch once all of the
+    # centerlines are in than to update it one row at a time. But the index covers every zone and
+    # generation, and while it is dropped all centerline reads (including the client GET paths)
+    # block until the update is committed. So this is only done when the table is empty, i.e. on
+    # the initial load, where there is nothing for readers to miss.
+    rebuild_index = False
+    if allow_index_rebuild and len(centerlines) > CENTERLINE_INDEX_REBUILD_THRESHOLD:
+        centerlines_exist_query = session.query(session.query(Centerline).exists())
+        if not centerlines_exist_query.scalar():
+            # DROP INDEX needs an ACCESS EXCLUSIVE lock on the table. It is taken up front,
+            # before the cap UPDATE below takes a ROW EXCLUSIVE lock, as two concurrent updates
+            # each holding the latter while waiting on the former would deadlock. Another load
+            # may have committed centerlines while this one was waiting on the lock, so the
+            # table is checked again once it is held.
+            session.execute(sa.text("LOCK TABLE centerlines IN ACCESS EXCLUSIVE MODE;"))
+            rebuild_index = not centerlines_exist_query.scalar()
+
+    # Cap the previous centerline generations (see previous comment). This is done with a
+    # single UPDATE statement, instead of loading and modifying every centerline in the zone.
+    (session
+        .query(Centerline)
+        .filter_by(zone_id=zone.id, last_zone_generation=None)
+        .update(
+            {Centerline.last_zone_generation: next_zone_generation - 1},
+            synchronize_session=False
+        )
+    )
 
-        minx, miny, maxx, maxy = centerlines.total_bounds
-        poly = Polygon([[minx, miny], [minx, maxy], [maxx, maxy], [maxx, miny], [minx, miny]])
-        bbox = f'SRID=4326;{str(poly)}'
-        zone.bounding_box = bbox
+    # Set the current zone generation's final timestamp. The current zone generation is the one
+    # inserted above, so there is no need to look it up.
+    zone_generation.final_timestamp = datetime.now()
 
-        # Cap the previous centerline generations (see previous comment).
-        previously_current_centerlines = (session
-            .query(Centerline)
-            .filter_by(zone_id=zone.id, last_zone_generation=None)
-            .all()
-        )
-        for previously_current_centerline in previously_current_centerlines:
-            previously_current_centerline.last_zone_generation = next_zone_generation - 1
-
-        # Set the current zone generation's final timestamp.
-        current_zone_generation = (session
-            .query(ZoneGeneration)
-            .filter_by(zone_id=zone.id)
-            .order_by(sa.desc(ZoneGeneration.id))
-            .first()
-        )
-        if current_zone_generation:
-            current_zone_generation.final_timestamp = datetime.now()
+    session.add(zone)
+    session.add(zone_generation)
 
-        session.add(zone)
-        session.add(zone_generation)
+    # The centerlines are copied in using the session's own (psycopg2) connection, so that
+    # they are written in the same transaction as the zone and zone generation changes.
+    session.flush()
+    if rebuild_index:
+        session.execute(sa.text(f"DROP INDEX IF EXISTS {CENTERLINE_GEOMETRY_INDEX};"))
+    cursor = session.connection().connection.cursor()
+    try:
+        _copy_centerlines(centerlines, cursor)
+    finally:
+        cursor.close()
+    if rebuild_index:
+        session.execute(sa.text(
+            f"CREATE INDEX {CENTERLINE_GEOMETRY_INDEX} ON centerlines USING GIST (geometry);"
+        ))
+
+def _update_zone_worker(args):
+    osmnx_name, name, profile = args
+    # Rebuilding the spatial index locks the whole centerlines table, which would serialize the
+    # workers (and block reads for the length of the batch), so it is never done here.
+    _update_zone(osmnx_name, name, profile, allow_index_rebuild=False)
+    return osmnx_name
+
+def update_zones(osmnx_names, profile, names=None, workers=None, wait=5, force_download=False):
+    """
+    Updates many zones at once. Equivalent to running `update_zone` on each of the
+    `osmnx_names` (with the matching entry in `names`, if given), but the zones are updated in
+    parallel, using a pool of `workers` processes (defaults to the number of CPUs).
 
-        engine = session.bind
-        try:
-            session.commit()
-            with warnings.catch_warnings():
-                warnings.simplefilter('ignore')
-                centerlines.to_postgis("centerlines", engine, if_exists="append")
-        except:
-            session.rollback()
-            raise
-        finally:
-            session.close()
-            engine.dispose()
+    Each worker process talks to the database using a connection pool of its own, so keep
+    `workers` well under the database's connection limit.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if names is None:
+        names = osmnx_names
+    if len(names) != len(osmnx_names):
+        raise ValueError("The osmnx_names and names lists must be the same length.")
+    # Two workers updating the same zone at the same time would race on its zone generation.
+    if len(set(osmnx_names)) != len(osmnx_names):
+        raise ValueError("The osmnx_names list contains duplicate entries.")
+
+    # The Cloud SQL Proxy (if needed) listens on a fixed port, so a single proxy is run for the
+    # whole batch, instead of one per update_zone call.
+    with OptionalCloudSQLProxyProcess(profile, wait=wait, force_download=force_download):
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            jobs = [(osmnx_name, name, profile) for osmnx_name, name in zip(osmnx_names, names)]
+            for osmnx_name in executor.map(_update_zone_worker, jobs):
+                print(f"Updated zone {osmnx_name!r}.")
 
 def show_zones(profile, wait=5, force_download=False):
     """Pretty-prints a list of zones in the database."""
     with OptionalCloudSQLProxyProcess(profile, wait=wait, force_download=force_download):
         session = db_sessionmaker(profile)()
+        # The zones and their generation and centerline counts are fetched in a single query.
+        # The counts are aggregated per zone in subqueries before being joined in, as joining
+        # the generations and centerlines tables directly would multiply their rows together.
+        n_generations = (session
+            .query(ZoneGeneration.zone_id, sa.func.count(ZoneGeneration.id).label("n"))
+            .group_by(ZoneGeneration.zone_id)
+            .subquery()
+        )
+        n_centerlines = (session
+            .query(Centerline.zone_id, sa.func.count(Centerline.id).label("n"))
+            .group_by(Centerline.zone_id)
+            .subquery()
+        )
         zones = (session
-            .query(Zone)
+            .query(
+                Zone.id, Zone.name, Zone.osmnx_name, Zone.bounding_box,
+                sa.func.coalesce(n_generations.c.n, 0), sa.func.coalesce(n_centerlines.c.n, 0)
+            )
+            .outerjoin(n_generations, n_generations.c.zone_id == Zone.id)
+            .outerjoin(n_centerlines, n_centerlines.c.zone_id == Zone.id)
+            .order_by(Zone.id)
             .all()
         )
         if len(zones) == 0:
@@ -259,17 +435,10 @@ def show_zones(profile, wait=5, force_download=False):
             table.add_column("N(Generations)", justify="right")
             table.add_column("N(Centerlines)", justify="right")
             table.add_column("Bounding Box", justify="left")
-            for zone in zones:
-                zone_gen_ids = [gen.id for gen in zone.zone_generations]
-                n_centerlines = (
-                    session.query(Centerline).filter(
-                        Centerline.first_zone_generation.in_(zone_gen_ids)
-                    ).count()
-                )
-                bounds = _poly_wkb_to_bounds_str(zone.bounding_box)
+            for zone_id, name, osmnx_name, bounding_box, n_gens, n_lines in zones:
+                bounds = _poly_wkb_to_bounds_str(bounding_box)
                 table.add_row(
-                    str(zone.id), zone.name, zone.osmnx_name, str(len(zone.zone_generations)),
-                    str(n_centerlines), str(bounds)
+                    str(zone_id), name, osmnx_name, str(n_gens), str(n_lines), str(bounds)
                 )
             console.print(table)
 
@@ -311,13 +480,16 @@ def show_dbs():
 def _validate_sector_geom(filepath):
     if not os.path.exists(filepath) or os.path.isdir(filepath):
         raise ValueError(f"File {filepath} does not exist or is not a file.")
+    # The file is parsed and its features unioned using shapely directly, which is much lighter
+    # weight than reading it into a GeoDataFrame and dissolving it.
     try:
-        sector_shape = (gpd.read_file(filepath)
-            .assign(tmpcol=0)
-            .dissolve(by='tmpcol')
-            .geometry.iloc[0]
-        )
-    except ValueError:
+        with open(filepath, "r") as f:
+            data = json.load(f)
+        features = data["features"] if data.get("type") == "FeatureCollection" else [data]
+        geoms = [shapely.geometry.shape(feature.get("geometry", feature)) for feature in features]
+        # most sector files contain a single polygon, which doesn't need to be unioned
+        sector_shape = geoms[0] if len(geoms) == 1 else shapely.ops.unary_union(geoms)
+    except (ValueError, KeyError, TypeError, AttributeError):
         raise ValueError(
             f"Could not decode the file at {filepath}, are you sure it's in GeoJSON format?"
         )
@@ -340,7 +512,12 @@ def insert_sector(sector_name, filepath, profile, wait=5, force_download=False):
             )
 
         sector_shape = _validate_sector_geom(filepath)
-        sector = Sector(name=sector_name, geometry=f'SRID=4326;{str(sector_shape)}')
+        # The geometry is sent to the database as binary WKB, which is much cheaper to serialize
+        # and to parse than WKT for sectors with many vertices.
+        sector = Sector(
+            name=sector_name,
+            geometry=sa.func.ST_GeomFromWKB(shapely.wkb.dumps(sector_shape), 4326)
+        )
         session.add(sector)
         try:
             session.commit()
@@ -348,9 +525,7 @@ def insert_sector(sector_name, filepath, profile, wait=5, force_download=False):
             session.rollback()
             raise
         finally:
-            engine = session.bind
             session.close()
-            engine.dispose()
 
 def delete_sector(sector_name, profile, wait=5, force_download=False):
     """Deletes a sector in the database."""
@@ -368,9 +543,7 @@ def delete_sector(sector_name, profile, wait=5, force_download=False):
             session.rollback()
             raise
         finally:
-            engine = session.bind
             session.close()
-            engine.dispose()
 
 def show_sectors(profile, wait=5, force_download=False):
     """Pretty-prints a list of sectors in the database."""
@@ -378,7 +551,12 @@ def show_sectors(profile, wait=5, force_download=False):
         try:
             session = db_sessionmaker(profile)()
             
-            sectors = session.query(Sector).all()
+            # Only the sector bounding boxes are shown, so those are computed in the database,
+            # instead of transferring the (possibly very detailed) sector geometries.
+            sectors = (session
+                .query(Sector.id, Sector.name, sa.func.ST_Envelope(Sector.geometry))
+                .all()
+            )
             if len(sectors) == 0:
                 print("No sectors in the database. :(")
                 return
@@ -388,13 +566,13 @@ def show_sectors(profile, wait=5, force_download=False):
             table.add_column("ID", justify="left")
             table.add_column("Name", justify="left")
             table.add_column("Bounding Box", justify="left")
-            for sector in session.query(Sector).all():
-                bounds = _poly_wkb_to_bounds_str(sector.geometry)
-                table.add_row(str(sector.id), sector.name, bounds)
+            for sector_id, sector_name, sector_envelope in sectors:
+                bounds = _poly_wkb_to_bounds_str(sector_envelope)
+                table.add_row(str(sector_id), sector_name, bounds)
             console.print(table)
         finally:
-            engine = session.bind
             session.close()
-            engine.dispose()
 
-__all__ = ['update_zone', 'show_zones', 'insert_sector', 'delete_sector', 'show_sectors']
+__all__ = [
+    'update_zone', 'update_zones', 'show_zones', 'insert_sector', 'delete_sector', 'show_sectors'
+]
@@ -5,11 +5,11 @@ setup(
     version='0.1',
     packages=find_packages(),
     install_requires=[
-        'sqlalchemy', 'psycopg2', 'geoalchemy2', 'click', 'osmnx', 'geopandas>=0.8.0', 'geopy',
+        'sqlalchemy', 'psycopg2', 'geoalchemy2', 'click', 'osmnx', 'geopandas>=0.8.0', 'pyproj',
         'rich', 'scipy'
     ],
     extras_require={'develop': [
-        'alembic', 'pylint', 'pytest', 'functions-framework', 'firebase-admin',
+        'alembic', 'pylint', 'pytest', 'pytest-xdist', 'functions-framework', 'firebase-admin',
         'google-cloud-logging', 'pg8000'
     ]},
     entry_points='''
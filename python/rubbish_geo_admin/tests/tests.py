@@ -20,6 +20,9 @@ class TestUpdateZone(unittest.TestCase):
         with patch('rubbish_geo_common.db_ops.get_db', new=get_db):
             self.session = db_sessionmaker('local')()
 
+    def tearDown(self):
+        self.session.close()
+
     @clean_db
     @alias_test_db
     def testNewZoneWrite(self):
@@ -58,7 +61,22 @@ class TestUpdateZone(unittest.TestCase):
         assert len(zone_generations) == 2
         assert zone_generations[0].id == 1
         assert zone_generations[1].id == 2
-    
+
+    @clean_db
+    @alias_test_db
+    def testInitialZoneWriteRebuildsIndex(self):
+        # The grid is far too small to hit the index rebuild threshold, so zero it out.
+        grid = get_grid()
+        with patch('rubbish_geo_admin.ops.CENTERLINE_INDEX_REBUILD_THRESHOLD', new=0):
+            update_zone("Grid City, California", "Foo, Bar", 'local', centerlines=grid)
+            update_zone("Grid City, California", "Foo, Bar", 'local', centerlines=grid)
+
+        indexes = self.session.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = 'centerlines';"
+        ).fetchall()
+        assert "idx_centerlines_geometry" in {index for index, in indexes}
+        assert self.session.query(Centerline).count() == 24
+
     @clean_db
     @alias_test_db
     @insert_grid
@@ -71,6 +89,9 @@ class testSectorOps(unittest.TestCase):
         with patch('rubbish_geo_common.db_ops.get_db', new=get_db):
             self.session = db_sessionmaker('local')()
 
+    def tearDown(self):
+        self.session.close()
+
     @clean_db
     @alias_test_db
     def testOps(self):
@@ -6,15 +6,18 @@ from datetime import datetime, timedelta
 from collections import defaultdict, Counter
 import json
 
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 import shapely
 from shapely.geometry import Point, LineString
-import geoalchemy2
 from geoalchemy2.shape import to_shape
 from scipy.stats import shapiro
 
 from rubbish_geo_common.db_ops import db_sessionmaker
 from rubbish_geo_common.orm import Pickup, Centerline, BlockfaceStatistic, Sector
-from rubbish_geo_common.consts import RUBBISH_TYPES
+from rubbish_geo_common.consts import RUBBISH_TYPES, RUBBISH_TYPE_SET
+
+CURB_SET = frozenset([None, "left", "right", "middle"])
 
 def point_side_of_centerline(point_geom, centerline_geom):
     """
@@ -57,6 +60,86 @@ def point_side_of_centerline(point_geom, centerline_geom):
     d = (p_x - x_start) * (y_stop - y_start) - (p_y - y_start) * (x_stop - x_start)
     return 'left' if d <= 0 else 'right'
 
+# Matches every point to its rank-th nearest centerline. The points are passed in as an array of
+# EWKT strings, and matched in a single LATERAL join, so matching a run's worth of points takes
+# one round trip instead of one (or more) per point. The <-> operator orders by true distance
+# using the GIST index on centerlines.geometry.
+NEAREST_CENTERLINES_SQL = sa.text("""
+    SELECT points.idx, match.id, match.dist
+    FROM unnest(CAST(:points AS text[])) WITH ORDINALITY AS points(ewkt, idx)
+    CROSS JOIN LATERAL (
+        SELECT
+            centerlines.id,
+            ST_Distance(centerlines.geometry, ST_GeomFromEWKT(points.ewkt)) AS dist
+        FROM centerlines
+        ORDER BY centerlines.geometry <-> ST_GeomFromEWKT(points.ewkt)
+        OFFSET :rank
+        LIMIT 1
+    ) AS match
+    ORDER BY points.idx;
+""")
+
+def nearest_centerlines_to_points(point_geoms, session, rank=0, check_distance=False):
+    """
+    Returns the centerlines nearest to each of the given points in the database. This is the
+    batched version of `nearest_centerline_to_point`, which it is otherwise identical to.
+
+    Parameters
+    ----------
+    point_geoms : ``list`` of ``shapely.geometry.Point``
+        Centerpoints of interest.
+    session: The database session.
+    rank : ``int``, default 0
+        The rank of the centerlines to return. Zero-indexed, so 0 means the closest centerline,
+        1 means second-closest, and so on.
+    check_distance: ``bool``, default False
+        Whether or not to ignore distance insert constraints. Should only be used in testing.
+
+    Returns
+    -------
+    ``list`` of ``rubbish.common.orm.Centerline object``
+        The centerlines matched, in the same order as the input points.
+    """
+    if rank > 100:
+        raise ValueError("Cannot retrieve centerline match with rank > 100.")
+    if len(point_geoms) == 0:
+        return []
+    point_geom_wkts = [f"SRID=4326;{str(point_geom)}" for point_geom in point_geoms]
+    matches = session.execute(
+        NEAREST_CENTERLINES_SQL, {"points": point_geom_wkts, "rank": rank}
+    ).fetchall()
+
+    # Every point has the same number of centerlines to choose from, so either every point gets
+    # a match, or none of them do.
+    if len(matches) < len(point_geoms):
+        n_centerlines = session.query(Centerline).count()
+        if n_centerlines == 0:
+            raise ValueError("No centerlines in the database!")
+        raise ValueError(
+            f"Cannot return result with rank {rank}: there are only {n_centerlines} centerlines "
+            f"in the database."
+        )
+
+    centerlines = session.query(Centerline).filter(
+        Centerline.id.in_({c_id for _, c_id, _ in matches})
+    ).all()
+    centerlines = {centerline.id: centerline for centerline in centerlines}
+
+    # unrectified coordinate values so these distance are approximate
+    if not check_distance:
+        for point_geom_wkt, (_, c_id, dist) in zip(point_geom_wkts, matches):
+            if dist > 0.0009:
+                warnings.warn(
+                    f"Matching point {point_geom_wkt} to centerline "
+                    f"{str(centerlines[c_id].geometry)} located >~100m (but <~1km) away. This "
+                    f"indicates potential data problems."
+                )
+            if dist > 0.001:
+                warnings.warn(
+                    f"{point_geom_wkt} is >~1km from nearest centerline and was discarded."
+                )
+    return [centerlines[c_id] for _, c_id, _ in matches]
+
 def nearest_centerline_to_point(point_geom, session, rank=0, check_distance=False):
     """
     Returns the centerline nearest to the given point in the database.
@@ -64,8 +147,9 @@ def nearest_centerline_to_point(point_geom, session, rank=0, check_distance=Fals
     Rank controls the point chosen, e.g. rank=0 means the nearest centerline, rank=1 means the
     second nearest, etcetera.
 
-    Implementation uses a two-step KNN -> ST_DISTANCE match. Refer to the page
-    https://postgis.net/workshops/postgis-intro/knn.html for more information.
+    Implementation uses an index-assisted KNN (<->) match. Refer to the page
+    https://postgis.net/workshops/postgis-intro/knn.html for more information. To match many
+    points at once, use `nearest_centerlines_to_points` instead.
     
     In the future we may introduce a cache of morphological tesselations into the database to
     to speed up match times.
@@ -86,87 +170,17 @@ def nearest_centerline_to_point(point_geom, session, rank=0, check_distance=Fals
     ``rubbish.common.orm.Centerline object``
         The centerline matched.
     """
-    if rank > 100:
-        raise ValueError("Cannot retrieve centerline match with rank > 100.")
-    point_geom_wkt = f"SRID=4326;{str(point_geom)}"
-    matches = (session
-        .query(Centerline)
-        .order_by(Centerline.geometry.distance_centroid(point_geom_wkt))
-        .limit(100)
-        .all()
-    )
-    if len(matches) == 0:
-        raise ValueError("No centerlines in the database!")
-    if rank >= len(matches):
-        raise ValueError(
-            f"Cannot return result with rank {rank}: there are only {len(matches)} centerlines "
-            f"in the database."
-        )
-    match, dist = (session
-        .query(
-            Centerline,
-            geoalchemy2.functions.ST_Distance(Centerline.geometry, point_geom_wkt)
-        )
-        .order_by(Centerline.geometry.ST_Distance(point_geom_wkt))
-        .offset(rank)
-        .first()
-    )
-    # unrectified coordinate values so these distance are approximate
-    if not check_distance:
-        if dist > 0.0009:
-            warnings.warn(
-                f"Matching point {point_geom_wkt} to centerline {str(match.geometry)} "
-                f"located >~100m (but <~1km) away. This indicates potential data problems."
-            )
-        if dist > 0.001:
-            warnings.warn(
-                f"{point_geom_wkt} is >~1km from nearest centerline and was discarded."
-            )
-    return match
+    return nearest_centerlines_to_points(
+        [point_geom], session, rank=rank, check_distance=check_distance
+    )[0]
 
-def write_pickups(pickups, profile, check_distance=True, logger=None):
+def _validate_pickups(pickups):
     """
-    Writes pickups to the database. This method hosts the primary logic for the overall service's
-    POST path.
-
-    Parameters
-    ----------
-    pickups: list
-        A `list` of pickups. Each entry in the list is expected to be a `dict` in the following
-        format:
-
-        ```
-        {"firebase_id": <str>,
-        "firebase_run_id": <str>,
-        "type": <str, from RUBBISH_TYPES>,
-        "timestamp": <int; UTC UNIX timestamp>,
-        "curb": <{left, right, middle, None}>,
-        "geometry": <str; POINT in WKT format>}
-        ```
-
-        The list is to contain *all* pickups associated with an individual run.
-    profile: str
-        The name of the database write_pickups will write to. This named database must either be
-        present on disk (written to `$HOME/.rubbish/config`, either manually or using the `set-db`
-        admin CLI command), or its connection information must be set using the 
-        `RUBBISH_POSTGIS_CONNSTR` environment variable.
-    check_distance: bool, default `True`
-        If set to `False`, the points will be matched to the nearest centerline in the database,
-        regardless of distance. If `True`, points that are too far from any centerlines in the
-        database (according to a heuristic threshold) will be discarded. This value should always
-        be set to `True` in `prod`, but may be set to `False` for local testing purposes.
-    logger: LogHandler object or None
-        If set, this method will write logs using this log handler. See the definition of
-        `LogHandler` in `python/functions/main.py`. If not set, logging is omitted.
+    Validates a run's pickups, performing type conversions in place. Raises a `ValueError` if any
+    of the pickups is invalid.
     """
-    # TODO: add debug-level logging. The logger is already being passed down by the function.
-    # if logger is not None:
-    #     logger.log_struct({"level": "debug", "message": "Got to write_pickups."})
-
-    if len(pickups) == 0:
-        return
-
-    # validate input and perform type conversions
+    # the five minutes of padding are just in case there is clock skew
+    max_timestamp = (datetime.utcnow() + timedelta(minutes=5)).timestamp()
     for pickup in pickups:
         if not isinstance(pickup, dict):
             raise ValueError(
@@ -189,26 +203,28 @@ def write_pickups(pickups, profile, check_distance=True, logger=None):
                 pickup[int_attr] = int(float(pickup[int_attr]))
             except ValueError:
                 raise ValueError(f"Found pickup with {int_attr} of non-castable type.")
-        # the five minutes of padding are just in case there is clock skew
-        if pickup["timestamp"] > (datetime.utcnow() + timedelta(minutes=5)).timestamp():
+        if pickup["timestamp"] > max_timestamp:
             raise ValueError(
                 f"Found pickup with greater than expected UTC timestamp {pickup['timestamp']}. "
                 f"Current server UTC UNIX time is {datetime.utcnow()}. Are you sure your "
                 f"timestamp is actually a UTC UNIX timestamp?"
             )
         curb = pickup["curb"]
-        if curb not in [None, "left", "right", "middle"]:
+        if curb not in CURB_SET:
             raise ValueError(
                 f"Found pickup with invalid curb value {curb} "
                 f"(must be one of 'left', 'right', 'middle', None)."
             )
-        if pickup["type"] not in RUBBISH_TYPES:
+        if pickup["type"] not in RUBBISH_TYPE_SET:
             raise ValueError(
                 f"Found pickup with type {pickup['type']!r} not in valid types {RUBBISH_TYPES!r}."
             )
 
-    session = db_sessionmaker(profile)()
-
+def _stage_pickups(pickups, session, check_distance=True):
+    """
+    Matches a run's (validated) pickups to centerlines and adds the resulting pickups and blockface
+    statistics to the session. Does not commit the session.
+    """
     # Snap points to centerlines.
     # 
     # Recall that pickup locations are inaccurate due to GPS inaccuracy. Because of this, a
@@ -235,15 +251,21 @@ def write_pickups(pickups, profile, check_distance=True, logger=None):
     points_needing_work = pickups
     iter = 0
     centerlines = dict()
+    # Parsed centerline geometries, keyed by centerline id. Points on the same block match the
+    # same centerline, so each geometry is only parsed from WKB once per run.
+    centerline_geoms = dict()
     while needs_work:
-        for point in points_needing_work:
+        matched_centerlines = nearest_centerlines_to_points(
+            [point["geometry"] for point in points_needing_work], session, rank=iter,
+            check_distance=check_distance
+        )
+        for point, centerline in zip(points_needing_work, matched_centerlines):
             point_geom = point["geometry"]
-            centerline = nearest_centerline_to_point(
-                point_geom, session, rank=iter, check_distance=check_distance
-            )
-            centerline_geom = to_shape(centerline.geometry)
-            lr = centerline_geom.project(point_geom, normalized=True)  # linear reference
             c_id = centerline.id
+            if c_id not in centerline_geoms:
+                centerline_geoms[c_id] = to_shape(centerline.geometry)
+            centerline_geom = centerline_geoms[c_id]
+            lr = centerline_geom.project(point_geom, normalized=True)  # linear reference
             if c_id not in centerlines:
                 centerlines[c_id] = (centerline, (lr, lr), [point])
             else:
@@ -311,7 +333,7 @@ def write_pickups(pickups, profile, check_distance=True, logger=None):
     for c_id in centerlines_needing_curb_inference:
         dists = []
         sides = []
-        centerline_geom = to_shape(centerlines[c_id][0].geometry)
+        centerline_geom = centerline_geoms[c_id]
         pickups = centerlines[c_id][2]
 
         # Shapiro requires n>=3 points, so if there are only 1 or 2, just set it to the first
@@ -346,13 +368,18 @@ def write_pickups(pickups, profile, check_distance=True, logger=None):
 
     # From this point on, assume all curbs are set.
 
-    # Construct a key-value map with blockface identifier keys and pickup_obj values. We will pass
+    # Construct a key-value map with blockface identifier keys and pickup row values. We will pass
     # over this map in the next step to construct blockface statistics.
+    #
+    # NOTE: the pickups are written using a single multi-row INSERT statement, instead of
+    # by adding a Pickup object to the session for each one, which would cost one INSERT round
+    # trip per pickup at flush time.
+    pickup_rows = []
     blockface_pickups = dict()
     blockface_lrs = dict()
     for c_id in centerlines:
         centerline_obj = centerlines[c_id][0]
-        centerline_geom = to_shape(centerline_obj.geometry)
+        centerline_geom = centerline_geoms[c_id]
         pickups = centerlines[c_id][2]
 
         for pickup in pickups:
@@ -361,27 +388,26 @@ def write_pickups(pickups, profile, check_distance=True, logger=None):
             linear_reference = centerline_geom.project(pickup_geom, normalized=True)
             snapped_pickup_geom = centerline_geom.interpolate(linear_reference, normalized=True)
 
-            pickup_obj = Pickup(
-                geometry=f'SRID=4326;{str(pickup_geom)}',
-                snapped_geometry=f'SRID=4326;{str(snapped_pickup_geom)}',
-                centerline_id=centerline_obj.id,
-                firebase_id=pickup['firebase_id'],
-                firebase_run_id=pickup['firebase_run_id'],
-                type=pickup['type'],
-                timestamp=datetime.utcfromtimestamp(pickup['timestamp']),
-                linear_reference=linear_reference,
-                curb=pickup['curb']
-            )
-            session.add(pickup_obj)
+            pickup_row = {
+                'geometry': f'SRID=4326;{str(pickup_geom)}',
+                'snapped_geometry': f'SRID=4326;{str(snapped_pickup_geom)}',
+                'centerline_id': centerline_obj.id,
+                'firebase_id': pickup['firebase_id'],
+                'firebase_run_id': pickup['firebase_run_id'],
+                'type': pickup['type'],
+                'timestamp': datetime.utcfromtimestamp(pickup['timestamp']),
+                'linear_reference': linear_reference,
+                'curb': pickup['curb']
+            }
+            pickup_rows.append(pickup_row)
 
-            blockface_id_tup = (centerline_obj, pickup_obj.curb)
+            blockface_id_tup = (centerline_obj, pickup_row['curb'])
             if blockface_id_tup not in blockface_pickups:
-                blockface_pickups[blockface_id_tup] = [pickup_obj]
+                blockface_pickups[blockface_id_tup] = [pickup_row]
             else:
-                blockface_pickups[blockface_id_tup] += [pickup_obj]
+                blockface_pickups[blockface_id_tup] += [pickup_row]
             if blockface_id_tup not in blockface_lrs:
-                blockface_lrs[blockface_id_tup] =\
-                    (pickup_obj.linear_reference, pickup_obj.linear_reference)
+                blockface_lrs[blockface_id_tup] = (linear_reference, linear_reference)
             else:
                 min_lr, max_lr = blockface_lrs[blockface_id_tup]
                 if linear_reference < min_lr:
@@ -389,8 +415,13 @@ def write_pickups(pickups, profile, check_distance=True, logger=None):
                 elif linear_reference > max_lr:
                     max_lr = linear_reference
                 blockface_lrs[blockface_id_tup] = (min_lr, max_lr)
+    session.execute(Pickup.__table__.insert().values(pickup_rows))
 
-    # Insert blockface statistics into the database (or update existing ones).
+    # Insert blockface statistics into the database (or update existing ones). This is done with
+    # a single upsert: blockfaces without a statistic get a new one, and blockfaces with one have
+    # this run folded into their running average. Doing the update server-side also means that
+    # concurrent writes to the same blockface cannot clobber one another.
+    blockface_statistic_rows = []
     for blockface_id_tup in blockface_pickups:
         centerline, curb = blockface_id_tup
         pickups = blockface_pickups[blockface_id_tup]
@@ -400,35 +431,107 @@ def write_pickups(pickups, profile, check_distance=True, logger=None):
         inferred_n_pickups = len(pickups) / coverage
         inferred_pickup_density = inferred_n_pickups / centerline.length_in_meters
 
-        prior_information = (session
-            .query(BlockfaceStatistic)
-            .filter(
-                BlockfaceStatistic.centerline_id == centerline.id,
-                BlockfaceStatistic.curb == curb
+        blockface_statistic_rows.append({
+            'centerline_id': centerline.id, 'curb': curb, 'num_runs': 1,
+            'rubbish_per_meter': inferred_pickup_density
+        })
+
+    blockface_statistics = BlockfaceStatistic.__table__
+    insert_stmt = pg_insert(blockface_statistics).values(blockface_statistic_rows)
+    session.execute(insert_stmt.on_conflict_do_update(
+        index_elements=[blockface_statistics.c.centerline_id, blockface_statistics.c.curb],
+        set_={
+            'num_runs': blockface_statistics.c.num_runs + 1,
+            'rubbish_per_meter': (
+                (blockface_statistics.c.rubbish_per_meter *
+                    blockface_statistics.c.num_runs +
+                    insert_stmt.excluded.rubbish_per_meter) /
+                (blockface_statistics.c.num_runs + 1)
             )
-            .one_or_none()
-        )
+        }
+    ))
 
-        kwargs = {'centerline_id': centerline.id, 'curb': curb}
-        if prior_information is None:
-            blockface_statistic = BlockfaceStatistic(
-                num_runs=1, rubbish_per_meter=inferred_pickup_density, **kwargs
-            )
-            session.add(blockface_statistic)
-        else:
-            updated_rubbish_per_meter = (
-                (prior_information.rubbish_per_meter *
-                    prior_information.num_runs +
-                    inferred_pickup_density) /
-                (prior_information.num_runs + 1)
-            )
-            blockface_statistic = BlockfaceStatistic(
-                num_runs=prior_information.num_runs + 1,
-                rubbish_per_meter=updated_rubbish_per_meter,
-                **kwargs
-            )
+def write_pickups(pickups, profile, check_distance=True, logger=None):
+    """
+    Writes pickups to the database. This method hosts the primary logic for the overall service's
+    POST path.
+
+    Parameters
+    ----------
+    pickups: list
+        A `list` of pickups. Each entry in the list is expected to be a `dict` in the following
+        format:
+
+        ```
+        {"firebase_id": <str>,
+        "firebase_run_id": <str>,
+        "type": <str, from RUBBISH_TYPES>,
+        "timestamp": <int; UTC UNIX timestamp>,
+        "curb": <{left, right, middle, None}>,
+        "geometry": <str; POINT in WKT format>}
+        ```
+
+        The list is to contain *all* pickups associated with an individual run.
+    profile: str
+        The name of the database write_pickups will write to. This named database must either be
+        present on disk (written to `$HOME/.rubbish/config`, either manually or using the `set-db`
+        admin CLI command), or its connection information must be set using the 
+        `RUBBISH_POSTGIS_CONNSTR` environment variable.
+    check_distance: bool, default `True`
+        If set to `False`, the points will be matched to the nearest centerline in the database,
+        regardless of distance. If `True`, points that are too far from any centerlines in the
+        database (according to a heuristic threshold) will be discarded. This value should always
+        be set to `True` in `prod`, but may be set to `False` for local testing purposes.
+    logger: LogHandler object or None
+        If set, this method will write logs using this log handler. See the definition of
+        `LogHandler` in `python/functions/main.py`. If not set, logging is omitted.
+    """
+    # TODO: add debug-level logging. The logger is already being passed down by the function.
+    # if logger is not None:
+    #     logger.log_struct({"level": "debug", "message": "Got to write_pickups."})
+
+    if len(pickups) == 0:
+        return
+
+    _validate_pickups(pickups)
+
+    session = db_sessionmaker(profile)()
+    try:
+        _stage_pickups(pickups, session, check_distance=check_distance)
+        session.commit()
+    except:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def write_runs(runs, profile, check_distance=True, logger=None):
+    """
+    Writes one or more runs to the database. All of the runs are written in a single transaction:
+    if any run fails to write, none of them are written.
+
+    Parameters
+    ----------
+    runs: dict
+        A `dict` with `firebase_run_id` keys and `list` of pickups values. See `write_pickups` for
+        the expected format of each list of pickups.
+    profile: str
+        The name of the database to write to. See `write_pickups`.
+    check_distance: bool, default `True`
+        Whether or not to discard points too far from any centerline. See `write_pickups`.
+    logger: LogHandler object or None
+        If set, this method will write logs using this log handler. See `write_pickups`.
+    """
+    runs = [pickups for pickups in runs.values() if len(pickups) != 0]
+    if len(runs) == 0:
+        return
+    for pickups in runs:
+        _validate_pickups(pickups)
 
+    session = db_sessionmaker(profile)()
     try:
+        for pickups in runs:
+            _stage_pickups(pickups, session, check_distance=check_distance)
         session.commit()
     except:
         session.rollback()
@@ -523,38 +626,41 @@ def radial_get(coord, distance, profile, include_na=False, offset=0):
         Query result.
     """
     session = db_sessionmaker(profile)()
-    coord = f'SRID=4326;POINT({coord[0]} {coord[1]})'
-    centerlines = (session
-        .query(Centerline)
-        .filter(Centerline.geometry.ST_Distance(coord) < distance)
-        .all()
-    )
-    centerline_ids = set(centerline.id for centerline in centerlines)
-    statistics = (session
-        .query(BlockfaceStatistic)
-        .filter(BlockfaceStatistic.centerline_id.in_(centerline_ids))
-        .all()
-    )
-    response_map = dict()
-    for statistic in statistics:
-        if statistic.centerline_id not in response_map:
-            centerline_dict = centerline_obj_to_dict(statistic.centerline)
-            response_map[statistic.centerline_id] = {
-                'centerline': centerline_dict,
-                'statistics': {'left': None, 'middle': None, 'right': None}
-            }
-        statistic_dict = blockface_statistic_obj_to_dict(statistic)
-        response_map[statistic.centerline_id]['statistics'][statistic.curb] = statistic_dict
-    if include_na:
-        for centerline in centerlines:
-            if centerline.id not in response_map:
-                response_map[centerline.id] = {
-                    'centerline': centerline_obj_to_dict(centerline),
+    try:
+        coord = f'SRID=4326;POINT({coord[0]} {coord[1]})'
+        centerlines = (session
+            .query(Centerline)
+            .filter(Centerline.geometry.ST_Distance(coord) < distance)
+            .all()
+        )
+        centerline_ids = set(centerline.id for centerline in centerlines)
+        statistics = (session
+            .query(BlockfaceStatistic)
+            .filter(BlockfaceStatistic.centerline_id.in_(centerline_ids))
+            .all()
+        )
+        response_map = dict()
+        for statistic in statistics:
+            if statistic.centerline_id not in response_map:
+                centerline_dict = centerline_obj_to_dict(statistic.centerline)
+                response_map[statistic.centerline_id] = {
+                    'centerline': centerline_dict,
                     'statistics': {'left': None, 'middle': None, 'right': None}
                 }
-    if len(response_map) == 0:
-        return []
-    return [response_map[centerline_id] for centerline_id in response_map]
+            statistic_dict = blockface_statistic_obj_to_dict(statistic)
+            response_map[statistic.centerline_id]['statistics'][statistic.curb] = statistic_dict
+        if include_na:
+            for centerline in centerlines:
+                if centerline.id not in response_map:
+                    response_map[centerline.id] = {
+                        'centerline': centerline_obj_to_dict(centerline),
+                        'statistics': {'left': None, 'middle': None, 'right': None}
+                    }
+        if len(response_map) == 0:
+            return []
+        return [response_map[centerline_id] for centerline_id in response_map]
+    finally:
+        session.close()
 
 def sector_get(sector_name, profile, include_na=False, offset=0):
     """
@@ -591,43 +697,46 @@ def sector_get(sector_name, profile, include_na=False, offset=0):
         Query result.
     """
     session = db_sessionmaker(profile)()
-    sector = (session
-        .query(Sector)
-        .filter(Sector.name == sector_name)
-        .one_or_none()
-    )
-    if sector is None:
-        raise ValueError(f"No {sector_name!r} sector in the database.")
-    centerlines = (session
-        .query(Centerline)
-        .filter(Centerline.geometry.ST_Intersects(sector.geometry))
-        .all()
-    )
-    centerline_ids = set(centerline.id for centerline in centerlines)
-    statistics = (session
-        .query(BlockfaceStatistic)
-        .filter(BlockfaceStatistic.centerline_id.in_(centerline_ids))
-        .all()
-    )
-
-    response_map = dict()
-    for statistic in statistics:
-        if statistic.centerline_id not in response_map:
-            centerline_dict = centerline_obj_to_dict(statistic.centerline)
-            response_map[statistic.centerline_id] = {
-                'centerline': centerline_dict,
-                'statistics': {'left': None, 'middle': None, 'right': None}
-            }
-        statistic_dict = blockface_statistic_obj_to_dict(statistic)
-        response_map[statistic.centerline_id]['statistics'][statistic.curb] = statistic_dict
-    if include_na:
-        for centerline in centerlines:
-            if centerline.id not in response_map:
-                response_map[centerline.id] = {
-                    'centerline': centerline_obj_to_dict(centerline),
+    try:
+        sector = (session
+            .query(Sector)
+            .filter(Sector.name == sector_name)
+            .one_or_none()
+        )
+        if sector is None:
+            raise ValueError(f"No {sector_name!r} sector in the database.")
+        centerlines = (session
+            .query(Centerline)
+            .filter(Centerline.geometry.ST_Intersects(sector.geometry))
+            .all()
+        )
+        centerline_ids = set(centerline.id for centerline in centerlines)
+        statistics = (session
+            .query(BlockfaceStatistic)
+            .filter(BlockfaceStatistic.centerline_id.in_(centerline_ids))
+            .all()
+        )
+
+        response_map = dict()
+        for statistic in statistics:
+            if statistic.centerline_id not in response_map:
+                centerline_dict = centerline_obj_to_dict(statistic.centerline)
+                response_map[statistic.centerline_id] = {
+                    'centerline': centerline_dict,
                     'statistics': {'left': None, 'middle': None, 'right': None}
                 }
-    return [response_map[centerline_id] for centerline_id in response_map]
+            statistic_dict = blockface_statistic_obj_to_dict(statistic)
+            response_map[statistic.centerline_id]['statistics'][statistic.curb] = statistic_dict
+        if include_na:
+            for centerline in centerlines:
+                if centerline.id not in response_map:
+                    response_map[centerline.id] = {
+                        'centerline': centerline_obj_to_dict(centerline),
+                        'statistics': {'left': None, 'middle': None, 'right': None}
+                    }
+        return [response_map[centerline_id] for centerline_id in response_map]
+    finally:
+        session.close()
 
 def coord_get(coord, profile, include_na=False):
     """
@@ -658,38 +767,41 @@ def coord_get(coord, profile, include_na=False):
         Query result.    
     """
     session = db_sessionmaker(profile)()
-    coord = shapely.geometry.Point(*coord)
+    try:
+        coord = shapely.geometry.Point(*coord)
 
-    def get_stats_objs(session, centerline_id):
-        return (session
-            .query(BlockfaceStatistic)
-            .filter(BlockfaceStatistic.centerline_id == centerline_id)
-            .all()
-        )
+        def get_stats_objs(session, centerline_id):
+            return (session
+                .query(BlockfaceStatistic)
+                .filter(BlockfaceStatistic.centerline_id == centerline_id)
+                .all()
+            )
 
-    centerline = None
-    if include_na == True:
-        centerline = nearest_centerline_to_point(coord, session)
-        stats_objs = get_stats_objs(session, centerline.id)
-    else:
-        stats_objs = []
-        rank = 0
-        while len(stats_objs) == 0:
-            centerline = nearest_centerline_to_point(coord, session, rank=rank)
+        centerline = None
+        if include_na == True:
+            centerline = nearest_centerline_to_point(coord, session)
             stats_objs = get_stats_objs(session, centerline.id)
-            rank += 1
-            if rank >= 10:
-                raise ValueError("Could not find non-null blockface statistics nearby.")
-
-    stats_dicts = blockface_statistic_objs_to_dicts(stats_objs)
-    statistics = {stat_dict['curb']: stat_dict for stat_dict in stats_dicts}
-    if 'left' not in statistics:
-        statistics['left'] = None
-    if 'right' not in statistics:
-        statistics['right'] = None
-    if 'middle' not in statistics:
-        statistics['middle'] = None
-    return {"centerline": centerline_obj_to_dict(centerline), "statistics": statistics}
+        else:
+            stats_objs = []
+            rank = 0
+            while len(stats_objs) == 0:
+                centerline = nearest_centerline_to_point(coord, session, rank=rank)
+                stats_objs = get_stats_objs(session, centerline.id)
+                rank += 1
+                if rank >= 10:
+                    raise ValueError("Could not find non-null blockface statistics nearby.")
+
+        stats_dicts = blockface_statistic_objs_to_dicts(stats_objs)
+        statistics = {stat_dict['curb']: stat_dict for stat_dict in stats_dicts}
+        if 'left' not in statistics:
+            statistics['left'] = None
+        if 'right' not in statistics:
+            statistics['right'] = None
+        if 'middle' not in statistics:
+            statistics['middle'] = None
+        return {"centerline": centerline_obj_to_dict(centerline), "statistics": statistics}
+    finally:
+        session.close()
 
 def run_get(run_id, profile):
     """
@@ -708,46 +820,49 @@ def run_get(run_id, profile):
         Query result.
     """
     session = db_sessionmaker(profile)()
-    # Runs are not a native object in the analytics database. Instead, pickups are stored
-    # with firebase_run_id and centerline_id columns set. We use this to get the
-    # (centerline, curb) combinations this run touched. We then find all blockface statistics
-    # for the given centerlines. Then we filter out statistics with unmatched curbs: e.g. if
-    # a run went only up the left side of Polk, we'll match both left and right sides, then
-    # filter out the right side.
-    pickups = session.query(Pickup).filter(Pickup.firebase_run_id == run_id).all()
-    if len(pickups) == 0:
-        raise ValueError(f"No pickups matching a run with ID {run_id} in the database.")
+    try:
+        # Runs are not a native object in the analytics database. Instead, pickups are stored
+        # with firebase_run_id and centerline_id columns set. We use this to get the
+        # (centerline, curb) combinations this run touched. We then find all blockface statistics
+        # for the given centerlines. Then we filter out statistics with unmatched curbs: e.g. if
+        # a run went only up the left side of Polk, we'll match both left and right sides, then
+        # filter out the right side.
+        pickups = session.query(Pickup).filter(Pickup.firebase_run_id == run_id).all()
+        if len(pickups) == 0:
+            raise ValueError(f"No pickups matching a run with ID {run_id} in the database.")
+
+        curb_map = defaultdict(list)
+        # TODO: shouldn't this be a set?
+        centerline_ids = []
+        for pickup in pickups:
+            centerline_ids.append(pickup.centerline_id)
+            curb_map[pickup.centerline_id].append(pickup.curb)
 
-    curb_map = defaultdict(list)
-    # TODO: shouldn't this be a set?
-    centerline_ids = []
-    for pickup in pickups:
-        centerline_ids.append(pickup.centerline_id)
-        curb_map[pickup.centerline_id].append(pickup.curb)
-
-    statistics = (
-        session.query(BlockfaceStatistic)
-        .filter(BlockfaceStatistic.centerline_id.in_(centerline_ids))
-        .all()
-    )
-    statistics_filtered = []
-    for statistic in statistics:
-        if statistic.curb in curb_map[statistic.centerline_id]:
-            statistics_filtered.append(statistic)
-
-    response_map = dict()
-    for statistic in statistics_filtered:
-        if statistic.centerline_id not in response_map:
-            centerline_dict = centerline_obj_to_dict(statistic.centerline)
-            response_map[statistic.centerline_id] = {
-                'centerline': centerline_dict,
-                'statistics': {'left': None, 'middle': None, 'right': None}
-            }
-        statistic_dict = blockface_statistic_obj_to_dict(statistic)
-        response_map[statistic.centerline_id]['statistics'][statistic.curb] = statistic_dict
-    return [response_map[centerline_id] for centerline_id in response_map]
+        statistics = (
+            session.query(BlockfaceStatistic)
+            .filter(BlockfaceStatistic.centerline_id.in_(centerline_ids))
+            .all()
+        )
+        statistics_filtered = []
+        for statistic in statistics:
+            if statistic.curb in curb_map[statistic.centerline_id]:
+                statistics_filtered.append(statistic)
+
+        response_map = dict()
+        for statistic in statistics_filtered:
+            if statistic.centerline_id not in response_map:
+                centerline_dict = centerline_obj_to_dict(statistic.centerline)
+                response_map[statistic.centerline_id] = {
+                    'centerline': centerline_dict,
+                    'statistics': {'left': None, 'middle': None, 'right': None}
+                }
+            statistic_dict = blockface_statistic_obj_to_dict(statistic)
+            response_map[statistic.centerline_id]['statistics'][statistic.curb] = statistic_dict
+        return [response_map[centerline_id] for centerline_id in response_map]
+    finally:
+        session.close()
 
 __all__ = [
-    'write_pickups', 'radial_get', 'sector_get', 'coord_get', 'run_get',
-    'nearest_centerline_to_point'
+    'write_pickups', 'write_runs', 'radial_get', 'sector_get', 'coord_get', 'run_get',
+    'nearest_centerline_to_point', 'nearest_centerlines_to_points'
 ]
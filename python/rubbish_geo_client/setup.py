@@ -7,5 +7,5 @@ setup(
     install_requires=[
         'shapely', 'geoalchemy2', 'scipy', 'click'
     ],
-    extras_require={'develop': ['pylint', 'pytest', 'geopandas']},
+    extras_require={'develop': ['pylint', 'pytest', 'pytest-xdist', 'geopandas']},
 )
@@ -17,8 +17,8 @@ from rubbish_geo_common.test_utils import (
     get_db, clean_db, alias_test_db, insert_grid, valid_pickups_from_geoms
 )
 from rubbish_geo_client.ops import (
-    write_pickups, run_get, coord_get, nearest_centerline_to_point, point_side_of_centerline,
-    sector_get, radial_get
+    write_pickups, write_runs, run_get, coord_get, nearest_centerline_to_point,
+    nearest_centerlines_to_points, point_side_of_centerline, sector_get, radial_get
 )
 
 try:
@@ -34,6 +34,9 @@ class TestWritePickups(unittest.TestCase):
         with patch('rubbish_geo_common.db_ops.get_db', new=get_db):
             self.session = db_sessionmaker('local')()
 
+    def tearDown(self):
+        self.session.close()
+
     @clean_db
     @alias_test_db
     @insert_grid
@@ -120,6 +123,27 @@ class TestWritePickups(unittest.TestCase):
         blockface_statistics = self.session.query(BlockfaceStatistic).all()
         assert len(blockface_statistics) == 1
 
+    @clean_db
+    @alias_test_db
+    @insert_grid
+    def testWritePickupsWithPriorRunUpdatesStatistic(self):
+        input = valid_pickups_from_geoms([Point(0.1, 0.0001), Point(0.9, 0.0001)], curb='left')
+        write_pickups(input, 'local')
+        first_rubbish_per_meter = self.session.query(BlockfaceStatistic).one().rubbish_per_meter
+        self.session.rollback()
+
+        input = valid_pickups_from_geoms(
+            [Point(0.1, 0.0001), Point(0.2, 0.0001), Point(0.8, 0.0001), Point(0.9, 0.0001)],
+            curb='left', firebase_run_id='bar'
+        )
+        write_pickups(input, 'local')
+
+        # The second run has twice the pickups over the same coverage, so the running average
+        # of the two densities is 1.5x the first.
+        blockface_statistic = self.session.query(BlockfaceStatistic).one()
+        assert blockface_statistic.num_runs == 2
+        assert blockface_statistic.rubbish_per_meter == pytest.approx(first_rubbish_per_meter * 1.5)
+
     @clean_db
     @alias_test_db
     @insert_grid
@@ -214,6 +238,50 @@ class TestWritePickups(unittest.TestCase):
 
     # TODO: test curb imputation behavior using sample points drawn from gaussian distriutions
 
+class TestWriteRuns(unittest.TestCase):
+    def setUp(self):
+        with patch('rubbish_geo_common.db_ops.get_db', new=get_db):
+            self.session = db_sessionmaker('local')()
+
+    def tearDown(self):
+        self.session.close()
+
+    @clean_db
+    @alias_test_db
+    @insert_grid
+    def testWriteRuns(self):
+        runs = {
+            'foo': valid_pickups_from_geoms(
+                [Point(0.1, 0), Point(0.9, 0)], firebase_run_id='foo', curb='left'
+            ),
+            'bar': valid_pickups_from_geoms(
+                [Point(0, 0.1), Point(0, 0.9)], firebase_run_id='bar', curb='left'
+            )
+        }
+        write_runs(runs, 'local')
+
+        pickups = self.session.query(Pickup).all()
+        assert len(pickups) == 4
+        assert {p.firebase_run_id for p in pickups} == {'foo', 'bar'}
+
+    @clean_db
+    @alias_test_db
+    @insert_grid
+    def testWriteRunsIsAtomic(self):
+        runs = {
+            'foo': valid_pickups_from_geoms(
+                [Point(0.1, 0), Point(0.9, 0)], firebase_run_id='foo', curb='left'
+            ),
+            # incomplete run, fails the coverage constraint
+            'bar': valid_pickups_from_geoms(
+                [Point(0.4, 0.0001), Point(0.6, 0.0001)], firebase_run_id='bar', curb='left'
+            )
+        }
+        with pytest.raises(ValueError):
+            write_runs(runs, 'local')
+
+        assert self.session.query(Pickup).count() == 0
+
 class TestPointSideOfCenterline(unittest.TestCase):
     def testLeft(self):
         expected = 'left'
@@ -237,6 +305,9 @@ class TestNearestCenterlineToPoint(unittest.TestCase):
         with patch('rubbish_geo_common.get_db', new=get_db):
             self.session = db_sessionmaker('local')()
 
+    def tearDown(self):
+        self.session.close()
+
     @clean_db
     @alias_test_db
     def testEmpty(self):
@@ -276,11 +347,27 @@ class TestNearestCenterlineToPoint(unittest.TestCase):
         )
         assert centerline.name == "0_0_1_0 Street"
 
+    @clean_db
+    @alias_test_db
+    @insert_grid
+    def testBatchResults(self):
+        centerlines = nearest_centerlines_to_points(
+            [Point(0, 0.5), Point(0.5, 2), Point(0, 0.5)], self.session, rank=0,
+            check_distance=True
+        )
+        assert [centerline.name for centerline in centerlines] == [
+            "0_0_0_1 Street", "1_2_0_2 Street", "0_0_0_1 Street"
+        ]
+        assert nearest_centerlines_to_points([], self.session) == []
+
 class TestRunGet(unittest.TestCase):
     def setUp(self):
         with patch('rubbish_geo_common.db_ops.get_db', new=get_db):
             self.session = db_sessionmaker('local')()
 
+    def tearDown(self):
+        self.session.close()
+
     @clean_db
     @alias_test_db
     @insert_grid
@@ -324,6 +411,9 @@ class TestCoordGet(unittest.TestCase):
         with patch('rubbish_geo_common.db_ops.get_db', new=get_db):
             self.session = db_sessionmaker('local')()
 
+    def tearDown(self):
+        self.session.close()
+
     @clean_db
     @alias_test_db
     @insert_grid
@@ -389,6 +479,9 @@ class TestSectorGet(unittest.TestCase):
         with patch('rubbish_geo_common.db_ops.get_db', new=get_db):
             self.session = db_sessionmaker('local')()
 
+    def tearDown(self):
+        self.session.close()
+
     @clean_db
     @alias_test_db
     @insert_grid
@@ -427,6 +520,9 @@ class TestRadialGet(unittest.TestCase):
         with patch('rubbish_geo_common.db_ops.get_db', new=get_db):
             self.session = db_sessionmaker('local')()
 
+    def tearDown(self):
+        self.session.close()
+
     @clean_db
     @alias_test_db
     @insert_grid
@@ -4,5 +4,7 @@ Library constants.
 
 RUBBISH_TYPES = ['tobacco', 'paper', 'plastic', 'other', 'food', 'glass']
 RUBBISH_TYPE_MAP = {v: i for i, v in enumerate(RUBBISH_TYPES)}
+# RUBBISH_TYPES is ordered (the database ENUM is built from it), so use this for membership tests.
+RUBBISH_TYPE_SET = frozenset(RUBBISH_TYPES)
 
-__all__ = ['RUBBISH_TYPES', 'RUBBISH_TYPE_MAP']
+__all__ = ['RUBBISH_TYPES', 'RUBBISH_TYPE_MAP', 'RUBBISH_TYPE_SET']
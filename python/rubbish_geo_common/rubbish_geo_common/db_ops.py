@@ -17,6 +17,35 @@ from rubbish_geo_common.orm import (
 
 APPDIR = pathlib.Path(click.get_app_dir("rubbish", force_posix=True))
 
+# Parsed configuration file cache. This is a (key, cfg) tuple, where the key is the config file
+# path plus its stat modification time and size, so that edits made to the file outside of set_db
+# are still picked up. See get_db_cfg.
+_DB_CFG_CACHE = None
+
+# Engines are cached by connection string, so that their connection pools are reused across calls
+# (and across invocations of a warm Cloud Function instance). See get_engine.
+_ENGINES = dict()
+# sessionmaker builds a new Session subclass on every call, so these are cached per engine too.
+_SESSIONMAKERS = dict()
+# Engines inherited from the parent process by a forked child. See _reset_engines_after_fork.
+_FORKED_ENGINES = []
+
+def _reset_engines_after_fork():
+    """
+    Clears the engine cache in a newly forked child process (e.g. a multiprocessing worker).
+
+    Pooled connections are sockets, which a forked child shares with its parent, so the child
+    must not use them. They must not be closed either, as closing a connection terminates the
+    server-side session the parent is still using. So the inherited engines are parked in
+    _FORKED_ENGINES, which keeps them from being garbage collected, and the child creates fresh
+    engines of its own on demand.
+    """
+    _FORKED_ENGINES.extend(_ENGINES.values())
+    _ENGINES.clear()
+    _SESSIONMAKERS.clear()
+
+os.register_at_fork(after_in_child=_reset_engines_after_fork)
+
 def run_cloud_sql_proxy(profile, force_download=False):
     """
     Internal method. Does the song and dance Google requires to shell psql through to a DB.
@@ -138,12 +167,27 @@ def set_db(profile, connstr, conntype, conname=None):
     with open(cfg_fp, "w") as f:
         cfg.write(f)
 
+    global _DB_CFG_CACHE
+    _DB_CFG_CACHE = None
+
 def get_db_cfg():
+    """
+    Gets the parsed configuration file, or None if there is no such file. The parsed file is
+    cached in-process, and only re-read if the file on disk has changed since the last call.
+    """
+    global _DB_CFG_CACHE
     cfg_fp = APPDIR / "config"
-    if not cfg_fp.exists():
+    try:
+        cfg_stat = os.stat(cfg_fp)
+    except FileNotFoundError:
         return None
+    key = (cfg_fp, cfg_stat.st_mtime_ns, cfg_stat.st_size)
+    if _DB_CFG_CACHE is not None and _DB_CFG_CACHE[0] == key:
+        return _DB_CFG_CACHE[1]
+
     cfg = configparser.ConfigParser()
     cfg.read(cfg_fp)
+    _DB_CFG_CACHE = (key, cfg)
     return cfg
 
 def get_db(profile):
@@ -171,47 +215,52 @@ def get_db(profile):
 
     return cfg_profile['connstr'], cfg_profile['conntype'], cfg_profile['conname']
 
-def db_sessionmaker(profile):
+def get_engine(profile):
     """
-    Returns a sessionmaker object for creating DB sessions.
+    Returns the SQLAlchemy engine for the given profile. Engines are created once per connection
+    string and then reused, so connections are checked out of a warm pool instead of being
+    re-established on every call.
     """
     connstr, _, _ = get_db(profile)
     if connstr == None:
         raise ValueError("connection string not set, run set_db first")
-    engine = sa.create_engine(connstr)
-    return sessionmaker(bind=engine)
+    if connstr not in _ENGINES:
+        _ENGINES[connstr] = sa.create_engine(
+            connstr, pool_size=5, max_overflow=10, pool_pre_ping=True, pool_recycle=1800
+        )
+    return _ENGINES[connstr]
+
+def db_sessionmaker(profile):
+    """
+    Returns a sessionmaker object for creating DB sessions. Like engines, sessionmakers are created
+    once per connection string and then reused.
+    """
+    engine = get_engine(profile)
+    if engine not in _SESSIONMAKERS:
+        _SESSIONMAKERS[engine] = sessionmaker(bind=engine)
+    return _SESSIONMAKERS[engine]
 
 def reset_db(profile, wait=5, force_download=False):
     """
     Resets the current database, deleting all data.
     """
+    # TRUNCATE drops each table's data files wholesale, which is much faster than deleting the
+    # rows one at a time, and RESTART IDENTITY resets the ID sequences in the same statement.
+    # TRUNCATE is transactional in Postgres, so a failure here leaves the database untouched.
+    #
+    # TRUNCATE takes an ACCESS EXCLUSIVE lock on every table, so it waits on any open transaction
+    # that has read from them (e.g. an idle session that was never closed). The lock timeout
+    # turns such a wait into an error instead of a hang.
+    tables = ", ".join(
+        orm_cls.__tablename__ for orm_cls in
+        [Pickup, BlockfaceStatistic, Centerline, Sector, ZoneGeneration, Zone]
+    )
     with OptionalCloudSQLProxyProcess(profile, wait=wait, force_download=force_download):
-        session = db_sessionmaker(profile)()
-
-        engine = session.bind
-        engine.execute('ALTER SEQUENCE zones_id_seq RESTART WITH 1;')
-        engine.execute('ALTER SEQUENCE zone_generations_id_seq RESTART WITH 1;')
-        engine.execute('ALTER SEQUENCE blockface_statistics_id_seq RESTART WITH 1;')
-        engine.execute('ALTER SEQUENCE pickups_id_seq RESTART WITH 1;')
-        engine.execute('ALTER SEQUENCE sectors_id_seq RESTART WITH 1;')
-        engine.execute('ALTER SEQUENCE centerlines_id_seq RESTART WITH 1;')
-
-        try:
-            session.query(Pickup).delete()
-            session.query(BlockfaceStatistic).delete()
-            session.query(Centerline).delete()
-            session.query(Sector).delete()
-            session.query(ZoneGeneration).delete()
-            session.query(Zone).delete()
-            session.commit()
-        except:
-            session.rollback()
-            raise
-        finally:
-            session.close()
-            engine.dispose()
+        with get_engine(profile).begin() as conn:
+            conn.execute(sa.text("SET LOCAL lock_timeout = '30s';"))
+            conn.execute(sa.text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE;"))
 
 __all__ = [
-    'set_db', 'get_db_cfg', 'get_db', 'db_sessionmaker', 'reset_db', 'run_cloud_sql_proxy',
-    'OptionalCloudSQLProxyProcess'
+    'set_db', 'get_db_cfg', 'get_db', 'get_engine', 'db_sessionmaker', 'reset_db',
+    'run_cloud_sql_proxy', 'OptionalCloudSQLProxyProcess'
 ]
@@ -93,6 +93,11 @@ class Pickup(Base):
 
 class BlockfaceStatistic(Base):
     __tablename__ = "blockface_statistics"
+    __table_args__ = (
+        sa.UniqueConstraint(
+            "centerline_id", "curb", name="uq_blockface_statistics_centerline_id_curb"
+        ),
+    )
     id = sa.Column("id", sa.Integer, primary_key=True)
     centerline_id =\
         sa.Column("centerline_id", sa.Integer, sa.ForeignKey("centerlines.id"), nullable=False)
@@ -42,6 +42,20 @@ class TestGetDB(unittest.TestCase):
             result = get_db('local')
             assert result == expected
 
+    @reset_app_dir
+    def testConfigFileEditIsPickedUp(self):
+        with patch('rubbish_geo_common.db_ops.APPDIR', new=get_app_dir()):
+            with open(pathlib.Path(TEST_APP_DIR_TMPDIR) / 'config', 'w') as f:
+                f.write("[local]\nconnstr = foo\nconntype = local\nconname = unset")
+            assert get_db('local') == ('foo', 'local', 'unset')
+
+            with open(pathlib.Path(TEST_APP_DIR_TMPDIR) / 'config', 'w') as f:
+                f.write("[local]\nconnstr = foobar\nconntype = local\nconname = unset")
+            assert get_db('local') == ('foobar', 'local', 'unset')
+
+            set_db(profile='local', connstr='baz', conntype='local')
+            assert get_db('local') == ('baz', 'local', 'unset')
+
 class TestSetDB(unittest.TestCase):
     @reset_app_dir
     def testWriteLocalConnection(self):
@@ -117,7 +117,7 @@ echo "# this file is auto-generated by deploy_functional_api.sh" > \
     $REQUIREMENTS_FILE
 pip freeze --exclude-editable | \
     grep -E \
-    "Shapely|SQLAlchemy|psycopg2|GeoAlchemy2|scipy|click|Flask|firebase-admin|pg8000|google-cloud-logging" \
+    "Shapely|SQLAlchemy|psycopg2|GeoAlchemy2|scipy|click|Flask|firebase-admin|pg8000|google-cloud-logging|orjson" \
     >> $REQUIREMENTS_FILE
 
 # Finally we are ready to deploy our functions.
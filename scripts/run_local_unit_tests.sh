@@ -7,8 +7,10 @@ set -e
 echo "Running Python unit tests..."
 pushd ../ 1>&0 && export RUBBISH_BASE_DIR=$(echo $PWD) && popd 1>&0
 pytest $RUBBISH_BASE_DIR/python/rubbish_geo_common/tests/tests.py
-pytest $RUBBISH_BASE_DIR/python/rubbish_geo_client/tests/tests.py
-pytest $RUBBISH_BASE_DIR/python/rubbish_geo_admin/tests/tests.py
+# The client and admin tests are database-bound, so they are run in parallel, with one database
+# per worker. The common tests share an app directory, so they are not.
+pytest -n auto $RUBBISH_BASE_DIR/python/rubbish_geo_client/tests/tests.py
+pytest -n auto $RUBBISH_BASE_DIR/python/rubbish_geo_admin/tests/tests.py
 
 echo "Stopping PostGIS container."
 docker stop rubbish-db-container
\ No newline at end of file